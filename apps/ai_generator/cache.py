@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.cache import caches
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'generations'
+# Hit/miss counters are kept in their own alias, out of reach of deck culling
+STATS_ALIAS = 'generation_stats'
+KEY_PREFIX = 'deck'
+STATS_KEY = 'stats:{}'
+
+def normalize_topic(topic: str) -> str:
+    """Normalize a topic so trivially different spellings share a cache entry"""
+    topic = re.sub(r'\s+', ' ', topic.casefold()).strip()
+    return topic.rstrip('.!?')
+
+class GenerationCache:
+    """Content-addressed cache for generated presentation decks"""
+    
+    def __init__(self, alias: str = CACHE_ALIAS, stats_alias: str = STATS_ALIAS):
+        self.alias = alias
+        self.stats_alias = stats_alias
+        self.enabled = settings.GENERATION_CACHE_ENABLED
+        self.ttl = settings.GENERATION_CACHE_TTL
+    
+    @property
+    def backend(self):
+        return caches[self.alias]
+    
+    @property
+    def stats_backend(self):
+        return caches[self.stats_alias]
+    
+    def make_key(self, topic: str, slide_count: int, model: str,
+                 temperature: float, prompt_version: str) -> str:
+        """Build the cache key from everything that influences the generated deck"""
+        fingerprint = json.dumps({
+            'topic': normalize_topic(topic),
+            'slide_count': int(slide_count),
+            'model': model,
+            'temperature': round(float(temperature), 3),
+            'prompt_version': prompt_version,
+        }, sort_keys=True)
+        digest = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+        return f"{KEY_PREFIX}:{digest}"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached deck for a key, or None on a miss"""
+        if not self.enabled:
+            return None
+        try:
+            content = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Generation cache read failed: {str(e)}")
+            return None
+        
+        self._incr_stat('hits' if content is not None else 'misses')
+        return content
+    
+    def set(self, key: str, content: Dict[str, Any]) -> None:
+        """Store a generated deck"""
+        if not self.enabled:
+            return
+        try:
+            self.backend.set(key, content, timeout=self.ttl)
+        except Exception as e:
+            logger.warning(f"Generation cache write failed: {str(e)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for status reporting"""
+        hits = self._get_stat('hits')
+        misses = self._get_stat('misses')
+        lookups = hits + misses
+        return {
+            'enabled': self.enabled,
+            'backend': settings.GENERATION_CACHE_BACKEND,
+            'ttl_seconds': self.ttl,
+            'max_entries': settings.GENERATION_CACHE_MAX_ENTRIES,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+        }
+    
+    def _incr_stat(self, name: str) -> None:
+        key = STATS_KEY.format(name)
+        try:
+            self.stats_backend.add(key, 0, timeout=None)
+            self.stats_backend.incr(key)
+        except Exception as e:
+            logger.debug(f"Generation cache stat update failed: {str(e)}")
+    
+    def _get_stat(self, name: str) -> int:
+        try:
+            return int(self.stats_backend.get(STATS_KEY.format(name), 0))
+        except Exception:
+            return 0
+
+generation_cache = GenerationCache()
@@ -0,0 +1,52 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+import uuid
+
+User = get_user_model()
+
+class TopicDeck(models.Model):
+    """A generated deck indexed by its normalized topic for near-duplicate reuse
+    
+    Holds the content Gemini returned, not the user's later edits. Decks
+    belong to the user they were generated for and are only offered back
+    to that user.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_decks')
+    topic = models.CharField(max_length=500)
+    slide_count = models.IntegerField()
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    content = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'topic_decks'
+        constraints = [
+            # One entry per distinct request; regenerating refreshes it
+            models.UniqueConstraint(
+                fields=['user', 'topic', 'slide_count', 'model', 'prompt_version'],
+                name='topic_deck_unique_request'
+            ),
+        ]
+        verbose_name = 'Topic Deck'
+        verbose_name_plural = 'Topic Decks'
+    
+    def __str__(self):
+        return f"{self.topic} ({self.slide_count} slides)"
+
+class TopicBucket(models.Model):
+    """One MinHash LSH band of a topic deck; similar topics share buckets"""
+    deck = models.ForeignKey(TopicDeck, on_delete=models.CASCADE, related_name='buckets')
+    bucket = models.BigIntegerField()
+    # Copied from the deck so a lookup is a single index range per band
+    slide_count = models.IntegerField()
+    
+    class Meta:
+        db_table = 'topic_buckets'
+        indexes = [
+            models.Index(fields=['bucket', 'slide_count'], name='topic_bucket_lookup_idx'),
+        ]
+        verbose_name = 'Topic Bucket'
+        verbose_name_plural = 'Topic Buckets'
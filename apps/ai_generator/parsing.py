@@ -0,0 +1,134 @@
+from typing import Dict, List, Any, Optional
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+SLIDES_ARRAY_RE = re.compile(r'"slides"\s*:\s*\[')
+FIELD_RE = '"{}"\\s*:\\s*"((?:[^"\\\\]|\\\\.)*)"'
+TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+
+def strip_markdown_fences(text: str) -> str:
+    """Remove ```json fences that Gemini sometimes wraps around JSON"""
+    text = text.strip()
+    if text.startswith('```json'):
+        text = text.replace('```json', '').replace('```', '').strip()
+    elif text.startswith('```'):
+        text = text.replace('```', '').strip()
+    return text
+
+def loads_tolerant(text: str) -> Any:
+    """json.loads that also accepts raw newlines inside strings and trailing commas"""
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return json.loads(TRAILING_COMMA_RE.sub(r'\1', text), strict=False)
+
+def salvage_deck(text: str) -> Dict[str, Any]:
+    """Recover title, description and every complete slide from a broken deck
+    
+    Works on output cut off at max_output_tokens or with a malformed
+    slide; incomplete or unreadable slide objects are dropped.
+    """
+    parser = SlideStreamParser()
+    parser.feed(strip_markdown_fences(text))
+    return {**parser.metadata(), 'slides': parser.slides}
+
+class SlideStreamParser:
+    """Incremental parser that yields slide objects as soon as they are complete
+    
+    Feed it chunks of a streamed deck response; each call returns the
+    slide dicts from the "slides" array whose closing brace has arrived.
+    """
+    
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.in_array = False
+        self.array_closed = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.object_start = None
+        self.slides: List[Dict[str, Any]] = []
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return the slides completed by it"""
+        self.buffer += chunk
+        completed = []
+        
+        if not self.in_array:
+            match = SLIDES_ARRAY_RE.search(self.buffer)
+            if not match:
+                return completed
+            self.in_array = True
+            self.pos = match.end()
+        
+        buffer = self.buffer
+        pos = self.pos
+        while pos < len(buffer) and not self.array_closed:
+            char = buffer[pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0 and char == '{':
+                    self.object_start = pos
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0:
+                    # End of the slides array itself
+                    self.array_closed = True
+                else:
+                    self.depth -= 1
+                    if self.depth == 0 and self.object_start is not None:
+                        slide = self._load_object(buffer[self.object_start:pos + 1])
+                        self.object_start = None
+                        if slide is not None:
+                            self.slides.append(slide)
+                            completed.append(slide)
+            pos += 1
+        
+        self.pos = pos
+        return completed
+    
+    def metadata(self) -> Dict[str, str]:
+        """Top-level title/description seen so far"""
+        text = strip_markdown_fences(self.buffer)
+        try:
+            content = json.loads(text)
+            if isinstance(content, dict):
+                return {
+                    key: content[key] for key in ('title', 'description')
+                    if isinstance(content.get(key), str)
+                }
+        except json.JSONDecodeError:
+            pass
+        
+        # Partial response: read the fields that precede the slides array
+        slides_at = text.find('"slides"')
+        head = text[:slides_at] if slides_at != -1 else text
+        metadata = {}
+        for key in ('title', 'description'):
+            match = re.search(FIELD_RE.format(key), head)
+            if match:
+                try:
+                    metadata[key] = json.loads(f'"{match.group(1)}"')
+                except json.JSONDecodeError:
+                    continue
+        return metadata
+    
+    def _load_object(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = loads_tolerant(text)
+        except json.JSONDecodeError:
+            logger.warning("Skipping malformed slide object in streamed response")
+            return None
+        return value if isinstance(value, dict) else None
@@ -0,0 +1,193 @@
+from django.conf import settings
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+from .providers import LLMProvider, create_provider
+from .ratelimit import RateLimiter, RateLimitExceeded, create_rate_limiter, gemini_rate_limiter
+from .resilience import CircuitBreaker, CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+class Backend:
+    """One (API key, model) pair with its own quota bucket, circuit breaker and health"""
+    
+    def __init__(self, name: str, provider: LLMProvider, limiter: RateLimiter, cooldown: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.provider = provider
+        self.limiter = limiter
+        self.cooldown = cooldown
+        self.breaker = breaker or CircuitBreaker(enabled=False)
+        self.calls = 0
+        self.errors = 0
+        self.quota_errors = 0
+        self.total_latency = 0.0
+        self.cooldown_until = 0.0
+        self.last_error = ''
+        self._lock = threading.Lock()
+    
+    @property
+    def model_name(self) -> str:
+        return self.provider.model_name
+    
+    @property
+    def healthy(self) -> bool:
+        """Not resting after a quota error"""
+        return time.monotonic() >= self.cooldown_until
+    
+    def record_success(self, seconds: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total_latency += seconds
+        self.breaker.record(True, seconds)
+    
+    def record_failure(self, error: Exception, quota_error: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += 1
+            self.last_error = str(error)[:200]
+            if quota_error:
+                self.quota_errors += 1
+                self.cooldown_until = time.monotonic() + self.cooldown
+        if quota_error:
+            # Quota says nothing about Gemini's health; the pool fails over instead
+            self.breaker.cancel()
+            # Gemini disagrees with our bucket: stop everyone until it refills
+            self.limiter.drain()
+        else:
+            self.breaker.record(False)
+    
+    def status(self) -> Dict[str, Any]:
+        quota = self.limiter.status()
+        successes = self.calls - self.errors
+        return {
+            'name': self.name,
+            'model': self.model_name,
+            'healthy': self.healthy,
+            'circuit': self.breaker.status(),
+            'available_requests': quota['available_requests'],
+            'requests_per_minute': quota['requests_per_minute'],
+            'headroom': quota['headroom'],
+            'calls': self.calls,
+            'errors': self.errors,
+            'quota_errors': self.quota_errors,
+            'avg_latency_ms': round(self.total_latency / successes * 1000, 1) if successes else None,
+            'last_error': self.last_error,
+        }
+
+class BackendPool:
+    """Route calls to the backend with the most quota headroom
+    
+    Backends are grouped into tiers by model, in preference order: the
+    primary model's keys are used first, and later models only take over
+    when every key of the earlier ones is out of quota or resting.
+    """
+    
+    def __init__(self, backends: Sequence[Backend]):
+        if not backends:
+            raise ValueError("A backend pool needs at least one backend")
+        self.backends = list(backends)
+        self.tiers: List[List[Backend]] = []
+        for backend in self.backends:
+            tier = next((tier for tier in self.tiers if tier[0].model_name == backend.model_name), None)
+            if tier is None:
+                self.tiers.append([backend])
+            else:
+                tier.append(backend)
+    
+    @property
+    def primary(self) -> Backend:
+        return self.backends[0]
+    
+    def acquire(self, max_wait: float, exclude: Iterable[Backend] = ()) -> Backend:
+        """Take a request from the best backend, waiting at most max_wait seconds
+        
+        Backends with an open circuit are skipped. Raises CircuitOpen when
+        that leaves none, and RateLimitExceeded when none frees up in time.
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            shortest_wait = None
+            candidates = self._candidates(exclude)
+            for backend in candidates:
+                if not backend.breaker.try_begin():
+                    continue
+                acquired, wait = backend.limiter.try_acquire()
+                if acquired:
+                    return backend
+                backend.breaker.cancel()
+                shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+            if shortest_wait is None and candidates:
+                raise CircuitOpen(retry_after=min(backend.breaker.retry_after() for backend in candidates))
+            if shortest_wait is None:
+                # Every backend was excluded
+                raise RateLimitExceeded(retry_after=1.0)
+            if shortest_wait > deadline - time.monotonic():
+                raise RateLimitExceeded(retry_after=shortest_wait)
+            time.sleep(shortest_wait)
+    
+    def has_alternative(self, exclude: Iterable[Backend]) -> bool:
+        excluded = set(exclude)
+        return any(backend not in excluded for backend in self.backends)
+    
+    def status(self) -> List[Dict[str, Any]]:
+        return [backend.status() for backend in self.backends]
+    
+    def _candidates(self, exclude: Iterable[Backend]) -> List[Backend]:
+        """Backends to try in order: healthy ones by tier and headroom, resting ones last"""
+        excluded = set(exclude)
+        ordered = []
+        for tier in self.tiers:
+            available = [backend for backend in tier if backend not in excluded]
+            ordered.extend(sorted(available, key=lambda backend: -backend.limiter.available()))
+        healthy = [backend for backend in ordered if backend.healthy]
+        return healthy + [backend for backend in ordered if not backend.healthy]
+
+def parse_model_spec(spec: str, default_rpm: int) -> Tuple[str, int]:
+    """'model' or 'model:rpm' -> (model, rpm)"""
+    model, _, rpm = spec.strip().partition(':')
+    try:
+        return model.strip(), max(1, int(rpm)) if rpm else default_rpm
+    except ValueError:
+        return model.strip(), default_rpm
+
+def create_breaker() -> CircuitBreaker:
+    """Circuit breaker configured by the GEMINI_BREAKER_* settings"""
+    return CircuitBreaker(
+        window=int(settings.GEMINI_BREAKER_WINDOW),
+        min_calls=int(settings.GEMINI_BREAKER_MIN_CALLS),
+        failure_ratio=float(settings.GEMINI_BREAKER_FAILURE_RATIO),
+        slow_call=float(settings.GEMINI_BREAKER_SLOW_CALL),
+        open_seconds=float(settings.GEMINI_BREAKER_OPEN_SECONDS),
+        enabled=settings.GEMINI_BREAKER_ENABLED
+    )
+
+def create_backend_pool() -> BackendPool:
+    """Build backends for every configured key and model
+    
+    GEMINI_API_KEYS lists the keys (GEMINI_API_KEY when empty) and
+    GEMINI_FALLBACK_MODELS the failover models after GEMINI_MODEL. The
+    local provider always runs as a single backend.
+    """
+    cooldown = float(settings.GEMINI_BACKEND_COOLDOWN)
+    if settings.LLM_PROVIDER != 'gemini':
+        provider = create_provider()
+        return BackendPool([Backend(provider.name, provider, gemini_rate_limiter, cooldown, create_breaker())])
+    
+    keys = settings.GEMINI_API_KEYS or [settings.GEMINI_API_KEY]
+    models = [(settings.GEMINI_MODEL, settings.GEMINI_RATE_LIMIT_RPM)] + [
+        parse_model_spec(spec, settings.GEMINI_RATE_LIMIT_RPM) for spec in settings.GEMINI_FALLBACK_MODELS
+    ]
+    backends = []
+    for model, rpm in models:
+        for index, key in enumerate(keys, start=1):
+            name = f"{model}/key{index}"
+            if not backends:
+                # The primary backend keeps the original shared bucket
+                limiter = gemini_rate_limiter
+            else:
+                limiter = create_rate_limiter(rpm, key=f'slidecraft:ratelimit:gemini:{name}')
+            provider = create_provider(api_key=key, model_name=model)
+            backends.append(Backend(name, provider, limiter, cooldown, create_breaker()))
+    return BackendPool(backends)
@@ -0,0 +1,279 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from typing import Any, Dict, Iterator, List, Optional
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from .ratelimit import LocalTokenBucket
+
+logger = logging.getLogger(__name__)
+
+class LLMResponse:
+    """Response (or streamed chunk) with the same shape as Gemini's"""
+    
+    def __init__(self, text: str):
+        self.text = text
+
+class LLMProvider:
+    """Interface every text-generation backend implements
+    
+    generate_content(prompt) returns an object with a .text attribute;
+    with stream=True it returns an iterator of such chunks instead.
+    """
+    
+    name = ''
+    display_name = ''
+    model_name = ''
+    
+    @property
+    def is_configured(self) -> bool:
+        return True
+    
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        raise NotImplementedError
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini backend (FREE tier)"""
+    
+    name = 'gemini'
+    display_name = 'Google Gemini'
+    
+    def __init__(self, api_key: str, model_name: str, max_tokens: int, temperature: float):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self._model = None
+        self._model_lock = threading.Lock()
+    
+    @property
+    def is_configured(self) -> bool:
+        """Whether an API key is set (checked without loading the SDK)"""
+        return bool(self.api_key)
+    
+    @property
+    def model(self):
+        """Gemini model, configured on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._create_model()
+        return self._model
+    
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        if stream:
+            kwargs['stream'] = True
+        return self.model.generate_content(prompt, **kwargs)
+    
+    def _create_model(self):
+        # Imported here: the SDK is slow to import and only API calls need it
+        import google.ai.generativelanguage as glm
+        import google.generativeai as genai
+        
+        model = self._build_model(genai)
+        # Each provider gets its own client bound to its key. genai.configure is
+        # process-global, so with several keys in the pool a model could bind to
+        # whichever key was configured last.
+        model._client = glm.GenerativeServiceClient(client_options={'api_key': self.api_key})
+        return model
+    
+    def _build_model(self, genai):
+        # Initialize the model with compatible configuration
+        try:
+            # Try with response_mime_type (newer versions)
+            return genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=genai.types.GenerationConfig(
+                    max_output_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    response_mime_type="application/json"
+                )
+            )
+        except TypeError:
+            # Fallback for older versions without response_mime_type
+            logger.info("Using fallback Gemini configuration (older API version)")
+            return genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=genai.types.GenerationConfig(
+                    max_output_tokens=self.max_tokens,
+                    temperature=self.temperature
+                )
+            )
+
+class LocalProviderError(Exception):
+    """Failure injected by the local provider"""
+
+class LocalProvider(LLMProvider):
+    """Offline backend that answers every prompt with deterministic, schema-valid output
+    
+    Meant for load tests and benchmarks: calls take `latency` seconds
+    (± `jitter` as a fraction), fail with probability `error_rate`, and
+    above `rate_limit_rpm` requests per minute raise the same 429 quota
+    error Gemini does. Latency and failures come from a seeded RNG, so a
+    run is reproducible.
+    """
+    
+    name = 'local'
+    display_name = 'Local (deterministic)'
+    model_name = 'local-deterministic'
+    
+    # Streamed responses are split into this many chunks
+    STREAM_CHUNKS = 20
+    
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rpm: int = 0, seed: int = 0):
+        self.latency = max(0.0, latency)
+        self.jitter = max(0.0, jitter)
+        self.error_rate = min(1.0, max(0.0, error_rate))
+        self.bucket = LocalTokenBucket(rate_limit_rpm, rate_limit_rpm / 60) if rate_limit_rpm > 0 else None
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+    
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        delay, fail = self._draw()
+        if self.bucket is not None and not self.bucket.try_acquire()[0]:
+            raise LocalProviderError("429 Resource has been exhausted (e.g. check quota).")
+        
+        text = self._respond(prompt)
+        if stream:
+            return self._stream(text, delay, fail)
+        
+        time.sleep(delay)
+        if fail:
+            raise LocalProviderError("500 Simulated local provider failure")
+        return LLMResponse(text)
+    
+    def _draw(self):
+        """Latency and failure for one call from the seeded RNG"""
+        with self._random_lock:
+            spread = self._random.uniform(-self.jitter, self.jitter)
+            fail = self._random.random() < self.error_rate
+        return self.latency * (1 + spread), fail
+    
+    def _stream(self, text: str, delay: float, fail: bool) -> Iterator[LLMResponse]:
+        size = max(1, -(-len(text) // self.STREAM_CHUNKS))
+        chunks = [text[start:start + size] for start in range(0, len(text), size)]
+        for index, chunk in enumerate(chunks):
+            time.sleep(delay / len(chunks))
+            if fail and index >= len(chunks) // 2:
+                # Fail mid-stream, like a dropped connection
+                raise LocalProviderError("500 Simulated local provider failure")
+            yield LLMResponse(chunk)
+    
+    def _respond(self, prompt: str) -> str:
+        """Pick an answer from the shape of the prompt"""
+        deck = re.search(r'Generate a professional (\d+)-slide presentation about "(.*?)"', prompt, re.S)
+        if deck:
+            return json.dumps(self._deck(deck.group(2), int(deck.group(1))), indent=2)
+        
+        if 'Create a detailed image description' in prompt:
+            title = re.search(r'Slide Title: (.*)', prompt)
+            subject = title.group(1).strip() if title else 'the slide topic'
+            return (f"A clean, modern flat illustration about {subject}, soft blue and white palette, "
+                    f"minimal business style, plenty of white space")
+        
+        if 'Enhance the following presentation content' in prompt:
+            data = self._embedded_json(prompt)
+            if data is not None:
+                return json.dumps(self._enhance(data))
+        
+        batch = re.search(r'Slides \(JSON\):\s*(\[.*?\])\s*\n', prompt, re.S)
+        if 'Regenerate content for these slides' in prompt and batch:
+            slides = json.loads(batch.group(1))
+            return json.dumps({'slides': [
+                {
+                    'slide_number': slide.get('slide_number'),
+                    'content': self._bullets(slide.get('title', ''), self._variant(prompt + str(slide)))
+                }
+                for slide in slides
+            ]})
+        
+        complete = re.search(r'Complete a (\d+)-slide presentation about "(.*?)"', prompt, re.S)
+        missing = re.search(r'Missing slide numbers: (\[[\d, ]*\])', prompt)
+        if complete and missing:
+            numbers = set(json.loads(missing.group(1)))
+            deck = self._deck(complete.group(2), int(complete.group(1)))
+            return json.dumps({'slides': [slide for slide in deck['slides'] if slide['slide_number'] in numbers]})
+        
+        regenerate = re.search(r'Regenerate content for a presentation slide about "(.*?)"', prompt, re.S)
+        if regenerate:
+            return self._bullets(regenerate.group(1), self._variant(prompt))
+        
+        return "Local provider response"
+    
+    def _deck(self, topic: str, slide_count: int) -> Dict[str, Any]:
+        slides = []
+        for number in range(1, slide_count + 1):
+            if number == 1:
+                title = f"Introduction to {topic}"
+            elif number == slide_count:
+                title = f"{topic}: Key Takeaways"
+            else:
+                title = f"{topic}: Insight {number - 1}"
+            slides.append({
+                "slide_number": number,
+                "title": title,
+                "content": self._bullets(title, number),
+                "image_prompt": f"Professional illustration for {title}"
+            })
+        return {
+            "title": f"{topic}: An Overview",
+            "description": f"A concise, structured look at {topic}.",
+            "slides": slides
+        }
+    
+    def _bullets(self, subject: str, variant: int) -> str:
+        angles = ('Why it matters', 'How it works', 'Common pitfalls', 'Real-world example', 'Next steps')
+        picked = [angles[(variant + offset) % len(angles)] for offset in range(3)]
+        return '\n'.join(f"• {angle} for {subject}" for angle in picked)
+    
+    def _variant(self, text: str) -> int:
+        return int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16)
+    
+    def _embedded_json(self, prompt: str) -> Optional[Dict[str, Any]]:
+        start, end = prompt.find('{'), prompt.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        try:
+            return json.loads(prompt[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+    
+    def _enhance(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize bullet markers; already-clean content comes back unchanged"""
+        slides: List[Dict[str, Any]] = []
+        for slide in data.get('slides', []):
+            slide = dict(slide)
+            if isinstance(slide.get('content'), str):
+                lines = [line.strip().lstrip('-*•').strip() for line in slide['content'].splitlines()]
+                slide['content'] = '\n'.join(f"• {line}" for line in lines if line)
+            slides.append(slide)
+        return {**data, 'slides': slides}
+
+def create_provider(name: Optional[str] = None, api_key: Optional[str] = None,
+                    model_name: Optional[str] = None) -> LLMProvider:
+    """Build the provider selected by LLM_PROVIDER
+    
+    api_key and model_name override GEMINI_API_KEY and GEMINI_MODEL.
+    """
+    name = name or settings.LLM_PROVIDER
+    if name == GeminiProvider.name:
+        return GeminiProvider(
+            api_key=settings.GEMINI_API_KEY if api_key is None else api_key,
+            model_name=model_name or settings.GEMINI_MODEL,
+            max_tokens=int(settings.GEMINI_MAX_TOKENS),
+            temperature=float(settings.GEMINI_TEMPERATURE)
+        )
+    if name == LocalProvider.name:
+        return LocalProvider(
+            latency=float(settings.LLM_LOCAL_LATENCY),
+            jitter=float(settings.LLM_LOCAL_LATENCY_JITTER),
+            error_rate=float(settings.LLM_LOCAL_ERROR_RATE),
+            rate_limit_rpm=int(settings.LLM_LOCAL_RATE_LIMIT_RPM),
+            seed=int(settings.LLM_LOCAL_SEED)
+        )
+    raise ImproperlyConfigured(f"Unknown LLM_PROVIDER '{name}' (expected 'gemini' or 'local')")
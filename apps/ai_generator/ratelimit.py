@@ -0,0 +1,170 @@
+from django.conf import settings
+from typing import Dict, Any, Tuple
+from apps.core.redis_client import get_redis_client
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class RateLimitExceeded(Exception):
+    """Raised when no Gemini quota is available within the allowed wait"""
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Gemini rate limit reached, retry in {retry_after:.1f}s")
+
+class LocalTokenBucket:
+    """In-process token bucket (single worker, tests and local development)"""
+    
+    backend = 'local'
+    
+    def __init__(self, capacity: int, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def try_acquire(self) -> Tuple[bool, float]:
+        """Take one token; returns (acquired, seconds until a token is available)"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True, 0.0
+            return False, (1 - self.tokens) / self.refill_per_second
+    
+    def drain(self) -> None:
+        with self.lock:
+            self.tokens = 0.0
+            self.updated_at = time.monotonic()
+    
+    def available(self) -> float:
+        with self.lock:
+            self._refill()
+            return self.tokens
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+# KEYS[1] bucket hash; ARGV: capacity, refill per second, tokens requested (0 = peek, -1 = drain)
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if requested < 0 then
+  tokens = 0
+elseif tokens >= requested then
+  tokens = tokens - requested
+  allowed = 1
+else
+  wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) * 2)
+return {allowed, tostring(wait), tostring(tokens)}
+"""
+
+class RedisTokenBucket:
+    """Token bucket shared by every worker through an atomic Redis script"""
+    
+    backend = 'redis'
+    
+    def __init__(self, capacity: int, refill_per_second: float, key: str):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.key = key
+        self.client = get_redis_client()
+        self.script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+    
+    def try_acquire(self) -> Tuple[bool, float]:
+        allowed, wait, _ = self._run(1)
+        return bool(allowed), float(wait)
+    
+    def drain(self) -> None:
+        self._run(-1)
+    
+    def available(self) -> float:
+        return float(self._run(0)[2])
+    
+    def _run(self, requested: int):
+        return self.script(keys=[self.key], args=[self.capacity, self.refill_per_second, requested])
+
+class RateLimiter:
+    """Acquire Gemini quota before each call, waiting up to a deadline or failing fast"""
+    
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.fallback_bucket = LocalTokenBucket(bucket.capacity, bucket.refill_per_second)
+    
+    def acquire(self, max_wait: float = 0.0) -> None:
+        """Take one token, sleeping at most max_wait seconds (0 = fail fast)"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            acquired, wait = self.try_acquire()
+            if acquired:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                raise RateLimitExceeded(retry_after=wait)
+            time.sleep(wait)
+    
+    def drain(self) -> None:
+        """Empty the bucket after Gemini itself reports quota exhaustion"""
+        try:
+            self.bucket.drain()
+        except Exception as e:
+            logger.warning(f"Rate limiter drain failed: {str(e)}")
+            self.fallback_bucket.drain()
+    
+    def available(self) -> float:
+        """Requests that could start right now"""
+        try:
+            return self.bucket.available()
+        except Exception:
+            return self.fallback_bucket.available()
+    
+    def status(self) -> Dict[str, Any]:
+        """Quota headroom for status reporting"""
+        try:
+            available = self.bucket.available()
+            backend = self.bucket.backend
+        except Exception:
+            available = self.fallback_bucket.available()
+            backend = self.fallback_bucket.backend
+        return {
+            'backend': backend,
+            'requests_per_minute': self.bucket.capacity,
+            'available_requests': int(available),
+            'headroom': round(available / self.bucket.capacity, 2),
+        }
+    
+    def try_acquire(self) -> Tuple[bool, float]:
+        """Take one token without waiting; returns (acquired, seconds until one is available)"""
+        try:
+            return self.bucket.try_acquire()
+        except Exception as e:
+            # Keep serving from a per-process bucket if Redis is unreachable
+            logger.warning(f"Shared rate limiter unavailable, using local bucket: {str(e)}")
+            return self.fallback_bucket.try_acquire()
+
+def create_rate_limiter(requests_per_minute: int, key: str = 'slidecraft:ratelimit:gemini') -> RateLimiter:
+    """Build a limiter with the configured bucket backend"""
+    capacity = max(1, int(requests_per_minute))
+    refill_per_second = capacity / 60.0
+    if settings.GEMINI_RATE_LIMIT_BACKEND == 'redis':
+        return RateLimiter(RedisTokenBucket(capacity, refill_per_second, key))
+    return RateLimiter(LocalTokenBucket(capacity, refill_per_second))
+
+gemini_rate_limiter = create_rate_limiter(settings.GEMINI_RATE_LIMIT_RPM)
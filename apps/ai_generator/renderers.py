@@ -0,0 +1,16 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+import json
+
+def format_sse_event(event, data):
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets SSE clients negotiate text/event-stream; plain responses become one error event"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_sse_event('error', data).encode(self.charset)
@@ -0,0 +1,118 @@
+from collections import deque
+from typing import Any, Dict, Optional
+import threading
+import time
+
+class CircuitOpen(Exception):
+    """Raised instead of calling Gemini while every backend's circuit is open"""
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Gemini circuit open, retry in {retry_after:.1f}s")
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a rolling window of calls
+    
+    Opens when at least min_calls of the last `window` calls were recorded
+    and the share of failures (errors, or calls slower than slow_call
+    seconds) reaches failure_ratio. After open_seconds one probe call is let
+    through: success closes the circuit, failure opens it again.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, window: int = 20, min_calls: int = 5, failure_ratio: float = 0.5,
+                 slow_call: float = 30.0, open_seconds: float = 30.0, enabled: bool = True):
+        self.window = max(1, window)
+        self.min_calls = max(1, min(min_calls, self.window))
+        self.failure_ratio = failure_ratio
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+        self.enabled = enabled
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._outcomes = deque(maxlen=self.window)
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def try_begin(self) -> bool:
+        """Whether a call may start now (reserves the probe when half-open)"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+    
+    def cancel(self) -> None:
+        """Release a reserved probe when the call did not happen or said nothing about health"""
+        with self._lock:
+            self._probe_in_flight = False
+    
+    def record(self, success: bool, seconds: float = 0.0) -> None:
+        if not self.enabled:
+            return
+        failure = not success or seconds >= self.slow_call
+        with self._lock:
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if failure:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failure)
+            if (self.state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio):
+                self._open()
+    
+    def retry_after(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+    
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            failures = sum(self._outcomes)
+            calls = len(self._outcomes)
+        return {
+            'state': self.state if self.enabled else 'disabled',
+            'recent_failure_ratio': round(failures / calls, 2) if calls else 0.0,
+            'times_opened': self.times_opened,
+        }
+    
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._outcomes.clear()
+
+class LatencyTracker:
+    """Rolling latency percentiles per operation, used to time hedged requests"""
+    
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, operation: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self.window)).append(seconds)
+    
+    def percentile(self, operation: str, quantile: float) -> Optional[float]:
+        """Latency at the quantile, or None until enough calls were seen"""
+        with self._lock:
+            samples = sorted(self._samples.get(operation, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * quantile))]
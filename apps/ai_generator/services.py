@@ -1,94 +1,353 @@
-import google.generativeai as genai
 from django.conf import settings
-from typing import Dict, List, Any
+from django.utils.functional import SimpleLazyObject
+from apps.core.metrics import registry
+from apps.core.timing import timed
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures import wait as wait_futures
 import json
+import math
 import logging
+import threading
 import time
-import random
+from .cache import generation_cache
+from .parsing import SlideStreamParser, loads_tolerant, salvage_deck, strip_markdown_fences
+from .pool import create_backend_pool
+from .ratelimit import RateLimitExceeded
+from .resilience import CircuitOpen, LatencyTracker
+from .similarity import topic_index
+from .singleflight import generation_flights
 
 logger = logging.getLogger(__name__)
 
+llm_calls = registry.counter(
+    'slidecraft_llm_calls_total', 'Calls to the text generation provider by outcome',
+    ['provider', 'backend', 'outcome']
+)
+hedged_calls = registry.counter(
+    'slidecraft_llm_hedged_calls_total', 'Hedged provider calls by operation and which call answered first',
+    ['operation', 'winner']
+)
+topic_reuse = registry.counter(
+    'slidecraft_topic_reuse_total', 'Decks served from the topic index instead of Gemini', ['source']
+)
+deck_repairs = registry.counter(
+    'slidecraft_deck_repairs_total', 'Decks completed from salvaged or short Gemini output', ['outcome']
+)
+
+# Bump whenever the deck prompt changes so cached decks are not reused
+PROMPT_VERSION = 'v1'
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether Gemini rejected a call for quota/rate reasons
+    
+    A false positive puts a backend in cooldown and drains the shared
+    bucket, so only HTTP 429 or an explicit quota message counts.
+    """
+    if isinstance(error, (RateLimitExceeded, CircuitOpen)):
+        return False
+    # google.api_core's TooManyRequests and ResourceExhausted carry the HTTP status as .code
+    if getattr(error, 'code', None) == 429 or getattr(error, 'status_code', None) == 429:
+        return True
+    message = str(error).lower()
+    return 'quota' in message or 'resource exhausted' in message or 'resource has been exhausted' in message
+
 class GeminiService:
-    """Google Gemini API service for generating presentations (FREE)"""
+    """Google Gemini API service for generating presentations (FREE)
+    
+    Calls go through the provider selected by LLM_PROVIDER (see providers.py),
+    spread over a pool of API keys and failover models (see pool.py).
+    """
     
     def __init__(self):
-        # Configure Gemini API
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model_name = settings.GEMINI_MODEL
-        self.max_tokens = int(settings.GEMINI_MAX_TOKENS)
+        # Building providers is cheap; the Gemini SDK loads on the first call
+        self.pool = create_backend_pool()
+        self.model_name = self.pool.primary.model_name
         self.temperature = float(settings.GEMINI_TEMPERATURE)
+        self.max_tokens = int(settings.GEMINI_MAX_TOKENS)
+        self.max_concurrency = max(1, int(settings.GEMINI_MAX_CONCURRENCY))
+        self.call_timeout = float(settings.GEMINI_CALL_TIMEOUT)
+        self.rate_limit_max_wait = float(settings.GEMINI_RATE_LIMIT_MAX_WAIT)
+        self.hedge_enabled = settings.GEMINI_HEDGE_ENABLED
+        self.hedge_quantile = float(settings.GEMINI_HEDGE_QUANTILE)
+        self.latency = LatencyTracker()
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+    
+    @property
+    def provider(self):
+        """Provider of the primary backend"""
+        return self.pool.primary.provider
+    
+    @property
+    def is_configured(self) -> bool:
+        """Whether the selected provider can make calls"""
+        return self.provider.is_configured
+    
+    def generate_presentation_content(self, topic: str, slide_count: int, use_cache: bool = True,
+                                      max_wait: Optional[float] = None, reuse_deck_id: Optional[str] = None,
+                                      user_id=None) -> Dict[str, Any]:
+        """Generate presentation content using Google Gemini (FREE)
+        
+        Raises RateLimitExceeded if no quota frees up within max_wait seconds
+        (defaults to GEMINI_RATE_LIMIT_MAX_WAIT); other failures fall back.
+        Concurrent calls for the same deck share one Gemini call (see singleflight.py).
+        reuse_deck_id names a deck offered by the topic index (see similarity.py);
+        the index is only read and written for the requesting user_id.
+        """
+        # The cache key doubles as the single-flight key for concurrent identical requests
+        cache_key = generation_cache.make_key(
+            topic, slide_count, self.model_name, self.temperature, PROMPT_VERSION
+        )
+        reused_content = self._reusable_content(
+            topic, slide_count, cache_key if use_cache else None, reuse_deck_id, user_id
+        )
+        if reused_content is not None:
+            return reused_content
+        
+        def generate():
+            content, complete = self._request_presentation_content(topic, slide_count, max_wait=max_wait)
+            # A dict, not a tuple: followers may receive it as JSON through Redis
+            return {'content': content, 'complete': complete}
         
-        # Initialize the model with compatible configuration
         try:
-            # Try with response_mime_type (newer versions)
-            self.model = genai.GenerativeModel(
-                model_name=self.model_name,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=self.max_tokens,
-                    temperature=self.temperature,
-                    response_mime_type="application/json"
-                )
-            )
-        except TypeError:
-            # Fallback for older versions without response_mime_type
-            logger.info("Using fallback Gemini configuration (older API version)")
-            self.model = genai.GenerativeModel(
-                model_name=self.model_name,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=self.max_tokens,
-                    temperature=self.temperature
-                )
-            )
+            result = generation_flights.run(cache_key, generate)
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating presentation content: {str(e)}")
+            # Return fallback content instead of failing (never cached)
+            return self._create_fallback_content(topic, slide_count)
+        
+        # Decks padded with fallback slides are never cached or indexed either
+        if result['complete']:
+            if use_cache:
+                generation_cache.set(cache_key, result['content'])
+            # Every caller of a shared flight gets the deck in its own index
+            topic_index.add(user_id, topic, slide_count, self.model_name, PROMPT_VERSION, result['content'])
+        return result['content']
+    
+    def _reusable_content(self, topic: str, slide_count: int, cache_key: Optional[str],
+                          reuse_deck_id: Optional[str] = None, user_id=None) -> Optional[Dict[str, Any]]:
+        """A stored deck that answers this request without calling Gemini, if any
+        
+        Tries the indexed deck the client picked, then the exact generation
+        cache and, with TOPIC_REUSE_MODE=auto, the most similar indexed topic.
+        cache_key is None when the caller asked for a fresh deck. Indexed
+        decks are only reused for the user they belong to.
+        """
+        if reuse_deck_id and topic_index.enabled:
+            content = topic_index.content(user_id, reuse_deck_id, slide_count)
+            if content is not None:
+                topic_reuse.inc(source='requested')
+                logger.info(f"Reusing indexed deck {reuse_deck_id} for topic '{topic}'")
+                return content
+        
+        if cache_key is None:
+            return None
+        
+        with timed('generation_cache'):
+            cached_content = generation_cache.get(cache_key)
+        if cached_content is not None:
+            logger.info(f"Generation cache hit for topic '{topic}'")
+            return cached_content
+        
+        if topic_index.auto_reuse:
+            with timed('topic_index'):
+                match = topic_index.find(user_id, topic, slide_count, self.model_name, PROMPT_VERSION)
+                content = topic_index.content(user_id, match.deck_id, slide_count) if match else None
+            if content is not None:
+                topic_reuse.inc(source='similar')
+                logger.info(f"Reusing deck for similar topic '{match.topic}' "
+                            f"({match.similarity:.2f}) for topic '{topic}'")
+                return content
+        return None
+    
+    def _request_presentation_content(self, topic: str, slide_count: int,
+                                      max_wait: Optional[float] = None) -> Tuple[Dict[str, Any], bool]:
+        """Call Gemini for a deck, raising if no usable JSON comes back
+        
+        Returns the content and whether it is all Gemini's, i.e. no missing
+        slide had to come from the fallback deck.
+        """
+        prompt = self._create_presentation_prompt(topic, slide_count)
+        
+        # Retry when Gemini reports quota exhaustion; the drained limiter paces the retry
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = self._generate_content(prompt, max_wait=max_wait, operation='deck')
+            except RateLimitExceeded:
+                raise
+            except Exception as e:
+                if is_quota_error(e) and attempt < max_retries - 1:
+                    logger.warning(f"Gemini quota exhausted, retry {attempt + 1} waits for the rate limiter")
+                    continue
+                raise e
+            
+            if not response.text:
+                raise Exception("Empty response from Gemini")
+            
+            with timed('parse'):
+                content = self._parse_deck(response.text)
+            return self._complete_deck(topic, slide_count, content, max_wait)
+        
+        raise Exception("Max retries exceeded")
+    
+    def _parse_deck(self, text: str) -> Dict[str, Any]:
+        """Deck JSON from a response, keeping the complete slides of a broken one
+        
+        Output cut off at max_output_tokens or with one malformed slide is
+        salvaged slide by slide instead of thrown away; raises only when not
+        a single slide can be recovered.
+        """
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+        try:
+            # Markdown fences, trailing commas, raw newlines in strings
+            return loads_tolerant(strip_markdown_fences(text))
+        except json.JSONDecodeError:
+            pass
+        
+        content = salvage_deck(text)
+        if not content['slides']:
+            raise ValueError("Could not parse JSON response")
+        deck_repairs.inc(outcome='salvaged')
+        logger.warning(f"Salvaged {len(content['slides'])} complete slides from a broken deck response")
+        return content
+    
+    def _complete_deck(self, topic: str, slide_count: int, content: Dict[str, Any],
+                       max_wait: Optional[float] = None) -> Tuple[Dict[str, Any], bool]:
+        """Fill in the slides a deck is missing with one follow-up call
+        
+        Returns the deck and False if any slide came from the fallback deck.
+        """
+        slides = content.get('slides') if isinstance(content, dict) else None
+        if not isinstance(slides, list) or len(slides) >= slide_count:
+            return content, True
+        # Stray strings or nulls in the array cannot be rendered anyway
+        slides = [slide for slide in slides if isinstance(slide, dict)]
+        received = {self._slide_number(slide) for slide in slides}
+        missing = [number for number in range(1, slide_count + 1) if number not in received]
+        fallback_count = 0
+        if missing:
+            extra, fallback_count = self._request_missing_slides(topic, slide_count, slides, missing, max_wait)
+            slides = sorted(slides + extra, key=lambda slide: self._slide_number(slide) or slide_count)
+        # save_deck bulk-inserts on a unique (presentation, slide_number), and salvaged
+        # and follow-up slides may reuse a number: renumber the merged deck 1..n
+        for number, slide in enumerate(slides, start=1):
+            slide['slide_number'] = number
+        content['slides'] = slides
+        content.setdefault('title', f"Presentation: {topic}")
+        content.setdefault('description', '')
+        return content, fallback_count == 0
     
-    def generate_presentation_content(self, topic: str, slide_count: int) -> Dict[str, Any]:
-        """Generate presentation content using Google Gemini (FREE)"""
+    @staticmethod
+    def _slide_number(slide: Dict[str, Any]) -> Optional[int]:
+        """A slide's number as an int, or None if the model returned something else"""
+        try:
+            return int(slide.get('slide_number'))
+        except (TypeError, ValueError):
+            return None
+    
+    def _request_missing_slides(self, topic: str, slide_count: int, slides: List[Dict[str, Any]],
+                                missing: List[int], max_wait: Optional[float] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Ask Gemini for just the missing slides; the fallback deck covers what it cannot
+        
+        Returns the slides in `missing` order and how many came from the
+        fallback deck. Never raises: the slides already received are worth
+        more than a failed follow-up.
+        """
+        returned = {}
+        try:
+            prompt = self._create_missing_slides_prompt(topic, slide_count, slides, missing)
+            response = self._generate_content(prompt, max_wait=max_wait, operation='deck_missing')
+            with timed('parse'):
+                for slide in salvage_deck(response.text or '')['slides']:
+                    number = slide['slide_number'] = self._slide_number(slide)
+                    if number in missing and slide.get('title') and slide.get('content'):
+                        returned[number] = slide
+        except Exception as e:
+            logger.warning(f"Follow-up for missing slides {missing} failed: {str(e)}")
+        
+        deck_repairs.inc(outcome='completed' if len(returned) == len(missing) else 'fallback')
+        fallback = {slide['slide_number']: slide for slide in self._create_fallback_content(topic, slide_count)['slides']}
+        return [returned.get(number) or fallback[number] for number in missing], len(missing) - len(returned)
+    
+    def stream_presentation_content(self, topic: str, slide_count: int, use_cache: bool = True,
+                                    reuse_deck_id: Optional[str] = None,
+                                    user_id=None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Stream a deck from Gemini slide by slide
+        
+        Yields ('slide', slide) as each slide object completes, then a final
+        ('deck', content) with the assembled title, description and slides.
+        If the stream fails, the missing slides come from the fallback deck.
+        """
+        cache_key = None
+        if use_cache:
+            cache_key = generation_cache.make_key(
+                topic, slide_count, self.model_name, self.temperature, PROMPT_VERSION
+            )
+        reused_content = self._reusable_content(topic, slide_count, cache_key, reuse_deck_id, user_id)
+        if reused_content is not None:
+            for slide in reused_content.get('slides', []):
+                yield 'slide', slide
+            yield 'deck', reused_content
+            return
+        
+        parser = SlideStreamParser()
         try:
             prompt = self._create_presentation_prompt(topic, slide_count)
+            response = self._generate_content(prompt, stream=True)
+            for chunk in response:
+                for slide in parser.feed(chunk.text):
+                    yield 'slide', slide
             
-            # Add retry logic for rate limiting
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = self.model.generate_content(prompt)
-                    
-                    if response.text:
-                        # Try to parse as JSON
-                        try:
-                            content = json.loads(response.text)
-                            return content
-                        except json.JSONDecodeError:
-                            # If not valid JSON, try to extract JSON from response
-                            text = response.text.strip()
-                            if text.startswith('```json'):
-                                text = text.replace('```json', '').replace('```', '').strip()
-                            elif text.startswith('```'):
-                                text = text.replace('```', '').strip()
-                            
-                            try:
-                                content = json.loads(text)
-                                return content
-                            except json.JSONDecodeError:
-                                logger.warning("Could not parse JSON response, using fallback")
-                                return self._create_fallback_content(topic, slide_count)
-                    else:
-                        raise Exception("Empty response from Gemini")
-                        
-                except Exception as e:
-                    if "quota" in str(e).lower() or "rate" in str(e).lower():
-                        if attempt < max_retries - 1:
-                            # Wait with exponential backoff
-                            wait_time = (2 ** attempt) + random.uniform(0, 1)
-                            logger.warning(f"Rate limit hit, waiting {wait_time:.2f}s before retry {attempt + 1}")
-                            time.sleep(wait_time)
-                            continue
-                    raise e
-            
-            raise Exception("Max retries exceeded")
+            if not parser.slides:
+                raise ValueError("No slides found in streamed response")
             
+            # Truncated stream: complete the deck instead of caching a short one
+            received = {slide.get('slide_number') for slide in parser.slides}
+            missing = [number for number in range(1, slide_count + 1) if number not in received]
+            extra, fallback_count = [], 0
+            if missing and len(parser.slides) < slide_count:
+                extra, fallback_count = self._request_missing_slides(topic, slide_count, parser.slides, missing)
+                for slide in extra:
+                    yield 'slide', slide
+        except RateLimitExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Error generating presentation content: {str(e)}")
-            # Return fallback content instead of failing
-            return self._create_fallback_content(topic, slide_count)
+            logger.error(f"Error streaming presentation content: {str(e)}")
+            fallback = self._create_fallback_content(topic, slide_count)
+            received = {slide.get('slide_number') for slide in parser.slides}
+            missing = [
+                slide for slide in fallback['slides']
+                if slide['slide_number'] not in received
+            ]
+            for slide in missing:
+                yield 'slide', slide
+            metadata = parser.metadata()
+            yield 'deck', {
+                'title': metadata.get('title', fallback['title']),
+                'description': metadata.get('description', fallback['description']),
+                'slides': parser.slides + missing
+            }
+            return
+        
+        metadata = parser.metadata()
+        content = {
+            'title': metadata.get('title', f"Presentation: {topic}"),
+            'description': metadata.get('description', ''),
+            'slides': parser.slides + extra
+        }
+        # Like the fallback deck, placeholder slides must not reach the cache or index
+        if not fallback_count:
+            if cache_key:
+                generation_cache.set(cache_key, content)
+            topic_index.add(user_id, topic, slide_count, self.model_name, PROMPT_VERSION, content)
+        yield 'deck', content
     
     def generate_slide_image_prompt(self, slide_title: str, slide_content: str) -> str:
         """Generate image prompt for slide (since Gemini doesn't generate images directly)"""
@@ -106,28 +365,71 @@ class GeminiService:
             Return only the image description, nothing else.
             """
             
-            response = self.model.generate_content(prompt)
+            response = self._generate_content(prompt, max_wait=self.call_timeout, operation='image_prompt')
             return response.text.strip() if response.text else f"Professional illustration related to {slide_title}"
-            
+        
         except Exception as e:
             logger.error(f"Error generating image prompt: {str(e)}")
             return f"Professional business illustration about {slide_title}"
     
+    def generate_slide_image_prompts(self, slides: List[Dict[str, Any]]) -> List[str]:
+        """Generate image prompts for several slides concurrently
+        
+        At most max_concurrency calls are in flight; a call that has not
+        answered within call_timeout gets the default prompt instead.
+        """
+        if not slides:
+            return []
+        
+        fallbacks = [
+            f"Professional illustration for {slide.get('title') or 'slide'}"
+            for slide in slides
+        ]
+        workers = min(self.max_concurrency, len(slides))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gemini-image-prompt')
+        try:
+            futures = [
+                executor.submit(
+                    self.generate_slide_image_prompt,
+                    slide.get('title', ''),
+                    slide.get('content', '')
+                )
+                for slide in slides
+            ]
+            
+            # Calls run in waves of `workers`, each wave bounded by call_timeout
+            deadline = time.monotonic() + self.call_timeout * math.ceil(len(slides) / workers)
+            prompts = []
+            for future, fallback in zip(futures, fallbacks):
+                try:
+                    prompts.append(future.result(timeout=max(0, deadline - time.monotonic())))
+                except FutureTimeoutError:
+                    logger.warning("Image prompt generation timed out, using default prompt")
+                    prompts.append(fallback)
+                except Exception as e:
+                    logger.warning(f"Failed to generate image prompt: {str(e)}")
+                    prompts.append(fallback)
+            return prompts
+        finally:
+            # Do not wait for stragglers that already timed out
+            executor.shutdown(wait=False, cancel_futures=True)
+    
     def enhance_presentation_content(self, presentation_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Enhance existing presentation content"""
+        """Enhance existing presentation content (fails fast when out of quota or Gemini is down)"""
         try:
             prompt = f"""
             Enhance the following presentation content to make it more engaging and professional:
             
-            {json.dumps(presentation_data, indent=2)}
+            {json.dumps(presentation_data, separators=(',', ':'), ensure_ascii=False)}
             
             Improve the content while maintaining the same structure. Make bullet points more impactful,
             improve titles, and ensure professional language throughout.
             
-            Return the enhanced content in the same JSON format.
+            Return the enhanced content in the same JSON format, keeping each slide_number.
+            Leave any field that needs no improvement exactly as it is.
             """
             
-            response = self.model.generate_content(prompt)
+            response = self._generate_content(prompt, max_wait=0, operation='enhance')
             
             if response.text:
                 try:
@@ -138,11 +440,215 @@ class GeminiService:
                     return presentation_data
             else:
                 return presentation_data
-                
+        
+        except (RateLimitExceeded, CircuitOpen):
+            raise
         except Exception as e:
             logger.error(f"Error enhancing presentation: {str(e)}")
             return presentation_data
     
+    def regenerate_slide_content(self, topic: str, slide_title: str) -> str:
+        """Generate fresh bullet points for one slide (fails fast when out of quota)"""
+        prompt = f"""
+        Regenerate content for a presentation slide about "{topic}".
+        Current slide title: "{slide_title}"
+        
+        Generate 3 bullet points (maximum 12 words each) that are:
+        - Professional and engaging
+        - Relevant to the topic and title
+        - Different from the current content
+        
+        Return only the bullet points in this format:
+        • Point 1
+        • Point 2  
+        • Point 3
+        """
+        
+        response = self._generate_content(prompt, max_wait=0, operation='regenerate')
+        return response.text.strip() if response.text else ''
+    
+    def regenerate_slides_content(self, topic: str, slides: List[Dict[str, Any]]) -> Dict[int, str]:
+        """Generate fresh bullet points for several slides with one Gemini call
+        
+        slides carry slide_number, title and content. Returns new content by
+        slide_number; slides missing from the answer are regenerated one by
+        one, and left out if that fails too. Raises RateLimitExceeded when
+        there is no quota for the batch call, CircuitOpen while Gemini is down.
+        """
+        if not slides:
+            return {}
+        
+        requested = {slide['slide_number'] for slide in slides}
+        regenerated = {}
+        try:
+            response = self._generate_content(
+                self._create_regenerate_prompt(topic, slides), max_wait=0, operation='regenerate_batch'
+            )
+            with timed('parse'):
+                regenerated = self._parse_regenerated_slides(response.text or '', requested)
+        except (RateLimitExceeded, CircuitOpen):
+            raise
+        except Exception as e:
+            logger.error(f"Batch slide regeneration failed: {str(e)}")
+        
+        missing = [slide for slide in slides if slide['slide_number'] not in regenerated]
+        if missing:
+            logger.warning(f"Batch regeneration returned {len(slides) - len(missing)} of {len(slides)} slides, "
+                           f"regenerating the rest individually")
+        for slide in missing:
+            try:
+                content = self.regenerate_slide_content(topic, slide['title'])
+            except (RateLimitExceeded, CircuitOpen):
+                # No quota (or no healthy backend) left for the remaining slides either
+                break
+            except Exception as e:
+                logger.error(f"Content regeneration failed: {str(e)}")
+                continue
+            if content:
+                regenerated[slide['slide_number']] = content
+        return regenerated
+    
+    def _create_regenerate_prompt(self, topic: str, slides: List[Dict[str, Any]]) -> str:
+        """Prompt asking for new content for several slides at once"""
+        context = [
+            {'slide_number': slide['slide_number'], 'title': slide['title'], 'current_content': slide['content']}
+            for slide in slides
+        ]
+        return f"""
+        Regenerate content for these slides of a presentation about "{topic}".
+        
+        Slides (JSON):
+        {json.dumps(context, separators=(',', ':'), ensure_ascii=False)}
+        
+        For every slide, generate 3 bullet points (maximum 12 words each) that are:
+        - Professional and engaging
+        - Relevant to the topic and the slide title
+        - Different from the slide's current content
+        
+        Return ONLY valid JSON with one entry per slide, keeping each slide_number:
+        {{"slides": [{{"slide_number": 1, "content": "• Point 1\\n• Point 2\\n• Point 3"}}]}}
+        """
+    
+    def _parse_regenerated_slides(self, text: str, requested) -> Dict[int, str]:
+        """New content by slide_number from a batch answer, ignoring unrequested slides"""
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = json.loads(strip_markdown_fences(text))
+        entries = data.get('slides', []) if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            raise ValueError("No slides list in batch regeneration response")
+        
+        regenerated = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            number, content = entry.get('slide_number'), entry.get('content')
+            if isinstance(number, str) and number.isdigit():
+                number = int(number)
+            if number in requested and isinstance(content, str) and content.strip():
+                regenerated[number] = content.strip()
+        return regenerated
+    
+    def rate_limit_status(self) -> Dict[str, Any]:
+        """Shared quota headroom of the primary backend"""
+        return self.pool.primary.limiter.status()
+    
+    def backend_status(self) -> List[Dict[str, Any]]:
+        """Usage, health and headroom of every pool backend"""
+        return self.pool.status()
+    
+    def _generate_content(self, prompt: str, max_wait: Optional[float] = None,
+                          operation: str = 'other', **kwargs):
+        """Call Gemini on the pool backend with the most quota headroom
+        
+        Waits up to max_wait seconds for quota (0 fails fast); defaults to
+        GEMINI_RATE_LIMIT_MAX_WAIT. When Gemini reports a backend out of
+        quota the call moves to the next backend instead of waiting; the
+        quota error is raised once every backend has refused. Raises
+        CircuitOpen without calling Gemini while every circuit is open.
+        operation groups calls for hedging latency percentiles.
+        """
+        deadline = time.monotonic() + (self.rate_limit_max_wait if max_wait is None else max_wait)
+        refused = []
+        while True:
+            with timed('quota_wait'):
+                backend = self.pool.acquire(max(0.0, deadline - time.monotonic()), exclude=refused)
+            try:
+                with timed('gemini'):
+                    if self.hedge_enabled and not kwargs.get('stream'):
+                        return self._hedged_call(backend, prompt, operation, **kwargs)
+                    return self._call_backend(backend, prompt, operation, **kwargs)
+            except Exception as e:
+                if is_quota_error(e):
+                    refused.append(backend)
+                    if self.pool.has_alternative(refused):
+                        logger.warning(f"Gemini backend {backend.name} is out of quota, failing over")
+                        continue
+                raise
+    
+    def _call_backend(self, backend, prompt: str, operation: str, **kwargs):
+        """One provider call, recorded in the backend's health and the latency window"""
+        start = time.perf_counter()
+        try:
+            response = backend.provider.generate_content(prompt, **kwargs)
+        except Exception as e:
+            quota_error = is_quota_error(e)
+            llm_calls.inc(provider=backend.provider.name, backend=backend.name,
+                          outcome='quota' if quota_error else 'error')
+            backend.record_failure(e, quota_error)
+            raise
+        seconds = time.perf_counter() - start
+        backend.record_success(seconds)
+        if not kwargs.get('stream'):
+            self.latency.observe(operation, seconds)
+        llm_calls.inc(provider=backend.provider.name, backend=backend.name, outcome='ok')
+        return response
+    
+    def _hedged_call(self, backend, prompt: str, operation: str, **kwargs):
+        """Send a duplicate when the call outlives the operation's p95; the first answer wins
+        
+        The duplicate only goes out if a backend has quota right away, and
+        the slower call is left to finish in the background.
+        """
+        delay = self.latency.percentile(operation, self.hedge_quantile)
+        if delay is None:
+            return self._call_backend(backend, prompt, operation, **kwargs)
+        
+        executor = self._get_hedge_executor()
+        first = executor.submit(self._call_backend, backend, prompt, operation, **kwargs)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        
+        try:
+            hedge_backend = self.pool.acquire(0)
+        except (RateLimitExceeded, CircuitOpen):
+            return first.result()
+        second = executor.submit(self._call_backend, hedge_backend, prompt, operation, **kwargs)
+        
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    hedged_calls.inc(operation=operation, winner='hedge' if future is second else 'original')
+                    return future.result()
+                error = future.exception()
+        hedged_calls.inc(operation=operation, winner='none')
+        raise error
+    
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            with self._hedge_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=max(4, self.max_concurrency * 4), thread_name_prefix='gemini-hedge'
+                    )
+        return self._hedge_executor
+    
     def _create_presentation_prompt(self, topic: str, slide_count: int) -> str:
         """Create the prompt for presentation generation"""
         return f"""
@@ -177,6 +683,31 @@ class GeminiService:
         Slide count: {slide_count}
         """
     
+    def _create_missing_slides_prompt(self, topic: str, slide_count: int, slides: List[Dict[str, Any]],
+                                      missing: List[int]) -> str:
+        """Prompt asking for only the given slides of a partly generated deck"""
+        outline = [
+            {'slide_number': slide.get('slide_number'), 'title': slide.get('title')}
+            for slide in slides if isinstance(slide, dict)
+        ]
+        return f"""
+        Complete a {slide_count}-slide presentation about "{topic}".
+        
+        Slides already written (JSON):
+        {json.dumps(outline, separators=(',', ':'), ensure_ascii=False)}
+        
+        Missing slide numbers: {json.dumps(missing)}
+        
+        Generate ONLY the missing slides, continuing the outline above:
+        - Each slide must have exactly 3 bullet points
+        - Each bullet point maximum 12 words
+        - Do not repeat the titles of the slides already written
+        - Slide {slide_count} is the Conclusion/Thank you slide
+        
+        Return ONLY valid JSON, no markdown formatting, no extra text:
+        {{"slides": [{{"slide_number": {missing[0]}, "title": "...", "content": "• Point 1\\n• Point 2\\n• Point 3", "image_prompt": "Professional image description"}}]}}
+        """
+    
     def _create_fallback_content(self, topic: str, slide_count: int) -> Dict[str, Any]:
         """Create fallback content if AI generation fails"""
         slides = []
@@ -212,5 +743,5 @@ class GeminiService:
             "slides": slides
         }
 
-# Initialize the service
-gemini_service = GeminiService()
+# Initialize the service on first use
+gemini_service = SimpleLazyObject(GeminiService)
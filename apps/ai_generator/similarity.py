@@ -0,0 +1,179 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
+from typing import Any, Dict, List, Optional, Set
+import datetime
+import hashlib
+import logging
+import random
+import re
+from .cache import normalize_topic
+from .models import TopicBucket, TopicDeck
+
+logger = logging.getLogger(__name__)
+
+# Shingle size in characters; trigrams tolerate abbreviations and plurals
+SHINGLE_SIZE = 3
+# 20 bands of 3 rows: topics with Jaccard similarity 0.5 share a bucket ~99% of
+# the time, 0.3 about 42%. Changing these requires rebuilding topic_buckets.
+MINHASH_BANDS = 20
+MINHASH_ROWS = 3
+# Candidate decks verified per lookup, those sharing the most bands first
+MAX_CANDIDATES = 50
+
+def shingles(topic: str) -> Set[int]:
+    """64-bit hashes of the character shingles of a topic
+    
+    Punctuation counts as a space, so "machine-learning!" and "machine
+    learning" produce the same shingles.
+    """
+    words = re.findall(r'\w+', normalize_topic(topic))
+    text = f" {' '.join(words)} "
+    return {
+        int.from_bytes(hashlib.blake2b(text[start:start + SHINGLE_SIZE].encode('utf-8'), digest_size=8).digest(), 'big')
+        for start in range(max(1, len(text) - SHINGLE_SIZE + 1))
+    }
+
+def jaccard(first: Set[int], second: Set[int]) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+class MinHasher:
+    """MinHash signatures and LSH band buckets for shingle sets
+    
+    Each permutation XORs the (already well mixed) 64-bit shingle hashes
+    with a random mask, which keeps a signature well under a millisecond in
+    pure Python. Masks come from a fixed seed so every process computes
+    the same buckets for the same topic.
+    """
+    
+    def __init__(self, bands: int = MINHASH_BANDS, rows: int = MINHASH_ROWS, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        generator = random.Random(seed)
+        self.masks = [generator.getrandbits(64) for _ in range(bands * rows)]
+    
+    def signature(self, hashes: Set[int]) -> List[int]:
+        values = list(hashes)
+        return [min(map(mask.__xor__, values)) for mask in self.masks]
+    
+    def buckets(self, hashes: Set[int]) -> List[int]:
+        """One signed 64-bit bucket id per band"""
+        signature = self.signature(hashes)
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(repr((band, rows)).encode('ascii'), digest_size=8).digest()
+            buckets.append(int.from_bytes(digest, 'big', signed=True))
+        return buckets
+
+class TopicMatch:
+    """An indexed deck similar to a requested topic"""
+    
+    def __init__(self, deck_id, topic: str, similarity: float):
+        self.deck_id = deck_id
+        self.topic = topic
+        self.similarity = similarity
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {'deck_id': str(self.deck_id), 'topic': self.topic, 'similarity': round(self.similarity, 3)}
+
+class TopicIndex:
+    """Near-duplicate index over generated decks (MinHash LSH in the database)
+    
+    A lookup hashes the topic into band buckets, reads the decks sharing
+    any bucket through one indexed query and keeps the most similar topic
+    above TOPIC_REUSE_THRESHOLD by exact shingle Jaccard similarity.
+    Every method is scoped to one user: decks are never offered across
+    accounts.
+    """
+    
+    def __init__(self):
+        self.mode = settings.TOPIC_REUSE_MODE
+        self.threshold = float(settings.TOPIC_REUSE_THRESHOLD)
+        self.max_age = datetime.timedelta(days=int(settings.TOPIC_REUSE_MAX_AGE_DAYS))
+        self.hasher = MinHasher()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ('suggest', 'auto')
+    
+    @property
+    def auto_reuse(self) -> bool:
+        return self.mode == 'auto'
+    
+    def add(self, user_id, topic: str, slide_count: int, model: str, prompt_version: str,
+            content: Dict[str, Any]) -> None:
+        """Index a freshly generated deck for its user (best effort)"""
+        if not self.enabled or user_id is None:
+            return
+        normalized = normalize_topic(topic)
+        try:
+            with transaction.atomic():
+                deck, created = TopicDeck.objects.update_or_create(
+                    user_id=user_id, topic=normalized[:500], slide_count=slide_count, model=model,
+                    prompt_version=prompt_version,
+                    defaults={'content': content}
+                )
+                if created:
+                    TopicBucket.objects.bulk_create([
+                        TopicBucket(deck=deck, bucket=bucket, slide_count=slide_count)
+                        for bucket in set(self.hasher.buckets(shingles(normalized)))
+                    ])
+        except IntegrityError:
+            # Another worker indexed the same request first
+            pass
+        except Exception as e:
+            logger.warning(f"Topic index update failed: {str(e)}")
+    
+    def find(self, user_id, topic: str, slide_count: int, model: str,
+             prompt_version: str) -> Optional[TopicMatch]:
+        """The user's most similar recent deck with the same slide count, or None"""
+        if not self.enabled or user_id is None:
+            return None
+        hashes = shingles(topic)
+        try:
+            rows = (
+                TopicBucket.objects
+                .filter(
+                    bucket__in=self.hasher.buckets(hashes),
+                    slide_count=slide_count,
+                    deck__user_id=user_id,
+                    deck__model=model,
+                    deck__prompt_version=prompt_version,
+                    deck__updated_at__gte=timezone.now() - self.max_age,
+                )
+                .values('deck_id', 'deck__topic')
+                # Shared bands estimate similarity: the likeliest matches, then the newest
+                .annotate(shared=Count('id'))
+                .order_by('-shared', '-deck__updated_at')[:MAX_CANDIDATES]
+            )
+            candidates = [(row['deck_id'], row['deck__topic']) for row in rows]
+        except Exception as e:
+            logger.warning(f"Topic index lookup failed: {str(e)}")
+            return None
+        
+        best = None
+        for deck_id, candidate_topic in candidates:
+            similarity = jaccard(hashes, shingles(candidate_topic))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = TopicMatch(deck_id, candidate_topic, similarity)
+        return best
+    
+    def content(self, user_id, deck_id, slide_count: int) -> Optional[Dict[str, Any]]:
+        """Stored content of one of the user's decks, if it exists and fits the slide count"""
+        if user_id is None:
+            return None
+        try:
+            return TopicDeck.objects.values_list('content', flat=True).get(
+                id=deck_id, user_id=user_id, slide_count=slide_count
+            )
+        except (TopicDeck.DoesNotExist, ValueError):
+            return None
+        except Exception as e:
+            logger.warning(f"Topic index read failed: {str(e)}")
+            return None
+
+topic_index = TopicIndex()
@@ -0,0 +1,213 @@
+from django.conf import settings
+from apps.core.metrics import registry
+from apps.core.redis_client import get_redis_client
+from typing import Any, Callable, Dict, Optional
+import copy
+import json
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+flights = registry.counter(
+    'slidecraft_singleflight_total', 'Generation calls by single-flight role', ['role']
+)
+
+class _Flight:
+    """One in-flight call in this process"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.result = None
+
+class LocalSingleFlight:
+    """Coalesce concurrent calls with the same key within one process"""
+    
+    backend = 'local'
+    
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+    
+    def run(self, key: str, func: Callable[[], Any], timeout: float) -> Any:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+            
+            if leader:
+                flights.inc(role='leader')
+                try:
+                    result = func()
+                    # Followers get copies; callers mutate the slides they receive
+                    flight.result = copy.deepcopy(result)
+                    flight.ok = True
+                    return result
+                finally:
+                    with self._lock:
+                        self._flights.pop(key, None)
+                    flight.done.set()
+            
+            if not flight.done.wait(max(0.0, deadline - time.monotonic())):
+                flights.inc(role='timeout')
+                logger.warning(f"Single-flight wait timed out for {key}, calling directly")
+                return func()
+            if flight.ok:
+                flights.inc(role='follower')
+                return copy.deepcopy(flight.result)
+            # The leader failed: the next waiter through the lock takes over
+            flights.inc(role='handover')
+
+# KEYS[1] lock; ARGV[1] owner token, ARGV[2] lease in ms (release when 0)
+OWNED_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+  return 0
+end
+if tonumber(ARGV[2]) > 0 then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return redis.call('DEL', KEYS[1])
+"""
+
+class RedisSingleFlight:
+    """Coalesce calls across workers with a leased Redis lock
+    
+    The leader holds `<prefix>:lock:<key>` and renews the lease while it
+    works, then publishes the JSON result under `<prefix>:result:<key>` for
+    `result_ttl` seconds. Followers poll for the result; if the lock goes
+    away without one (the leader failed or its worker died and the lease
+    expired), the first follower to take the lock becomes the new leader.
+    """
+    
+    backend = 'redis'
+    
+    def __init__(self, lease: float, result_ttl: float, poll_interval: float = 0.1,
+                 prefix: str = 'slidecraft:singleflight'):
+        self.lease_ms = max(1000, int(lease * 1000))
+        self.result_ttl_ms = max(1000, int(result_ttl * 1000))
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self.client = get_redis_client()
+        self.script = self.client.register_script(OWNED_LOCK_SCRIPT)
+    
+    def run(self, key: str, func: Callable[[], Any], timeout: float) -> Any:
+        deadline = time.monotonic() + timeout
+        lock_key = f"{self.prefix}:lock:{key}"
+        result_key = f"{self.prefix}:result:{key}"
+        while True:
+            token = uuid.uuid4().hex
+            if self.client.set(lock_key, token, nx=True, px=self.lease_ms):
+                return self._lead(lock_key, result_key, token, func)
+            
+            result = self._wait(lock_key, result_key, deadline)
+            if result is not None:
+                flights.inc(role='follower')
+                return result
+            if time.monotonic() >= deadline:
+                flights.inc(role='timeout')
+                logger.warning(f"Single-flight wait timed out for {key}, calling directly")
+                return func()
+            flights.inc(role='handover')
+            logger.info(f"Single-flight leader for {key} went away, taking over")
+    
+    def _lead(self, lock_key: str, result_key: str, token: str, func: Callable[[], Any]) -> Any:
+        flights.inc(role='leader')
+        # A result left by an earlier flight must not reach this flight's followers
+        self.client.delete(result_key)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._renew, args=(lock_key, token, stop), daemon=True)
+        heartbeat.start()
+        try:
+            result = func()
+            try:
+                # Published before the lock is released, so a follower never sees neither
+                self.client.set(result_key, json.dumps(result), px=self.result_ttl_ms)
+            except Exception as e:
+                logger.warning(f"Could not publish single-flight result: {str(e)}")
+            return result
+        finally:
+            stop.set()
+            try:
+                self.script(keys=[lock_key], args=[token, 0])
+            except Exception as e:
+                logger.warning(f"Could not release single-flight lock: {str(e)}")
+    
+    def _renew(self, lock_key: str, token: str, stop: threading.Event) -> None:
+        while not stop.wait(self.lease_ms / 3000):
+            try:
+                if not self.script(keys=[lock_key], args=[token, self.lease_ms]):
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew single-flight lease: {str(e)}")
+    
+    def _wait(self, lock_key: str, result_key: str, deadline: float) -> Optional[Any]:
+        """Poll until the result appears, the lock is gone or the deadline passes"""
+        while True:
+            raw = self.client.get(result_key)
+            if raw is None and not self.client.exists(lock_key):
+                # The leader may have published between the two reads
+                raw = self.client.get(result_key)
+                if raw is None:
+                    return None
+            if raw is not None:
+                return json.loads(raw)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.poll_interval, remaining))
+
+class SingleFlight:
+    """Run one call per key at a time and share its result with concurrent callers
+    
+    Falls back to in-process coalescing if Redis is unreachable.
+    """
+    
+    def __init__(self, group=None, timeout: float = 60.0):
+        self.group = group
+        self.timeout = timeout
+        self.fallback = group if isinstance(group, LocalSingleFlight) else LocalSingleFlight()
+    
+    @property
+    def backend(self) -> str:
+        return self.group.backend if self.group is not None else 'off'
+    
+    def run(self, key: str, func: Callable[[], Any]) -> Any:
+        if self.group is None:
+            return func()
+        if self.group is self.fallback:
+            return self.group.run(key, func, self.timeout)
+        
+        called = []
+        
+        def tracked():
+            called.append(True)
+            return func()
+        
+        try:
+            return self.group.run(key, tracked, self.timeout)
+        except Exception as e:
+            if called:
+                raise
+            logger.warning(f"Shared single-flight unavailable, coalescing locally: {str(e)}")
+            return self.fallback.run(key, func, self.timeout)
+
+def create_single_flight() -> SingleFlight:
+    """Build the single-flight group for the configured backend (redis, local or off)"""
+    backend = settings.GENERATION_SINGLEFLIGHT_BACKEND
+    timeout = float(settings.GENERATION_SINGLEFLIGHT_TIMEOUT)
+    if backend == 'redis':
+        return SingleFlight(RedisSingleFlight(
+            lease=float(settings.GENERATION_SINGLEFLIGHT_LEASE),
+            result_ttl=float(settings.GENERATION_SINGLEFLIGHT_RESULT_TTL)
+        ), timeout)
+    if backend == 'local':
+        return SingleFlight(LocalSingleFlight(), timeout)
+    return SingleFlight(None, timeout)
+
+generation_flights = create_single_flight()
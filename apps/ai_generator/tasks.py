@@ -0,0 +1,109 @@
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from apps.authentication.services import credit_service
+from apps.core.timing import timed
+from apps.presentations.models import Presentation
+from apps.presentations.services import persistence_service
+from .ratelimit import RateLimitExceeded
+from .services import gemini_service
+import logging
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+def _report_progress(task, stage, progress):
+    """Publish job progress to the result backend (best effort)"""
+    if task.request.is_eager:
+        return
+    try:
+        task.update_state(state='PROGRESS', meta={'stage': stage, 'progress': progress})
+    except Exception as e:
+        logger.warning(f"Failed to report generation progress: {str(e)}")
+
+@shared_task(bind=True, name='ai_generator.generate_presentation', max_retries=5)
+def generate_presentation_task(self, presentation_id, use_cache=True, reuse_deck_id=None):
+    """Generate slides for a queued presentation using Google Gemini AI (FREE)"""
+    try:
+        presentation = Presentation.objects.select_related('user').get(id=presentation_id)
+    except Presentation.DoesNotExist:
+        logger.warning(f"Presentation {presentation_id} no longer exists, skipping generation")
+        credit_service.refund(presentation_id)
+        return {'presentation_id': presentation_id, 'status': 'missing'}
+    
+    if presentation.status != 'generating':
+        # Already processed (e.g. redelivered after a worker restart)
+        return {'presentation_id': presentation_id, 'status': presentation.status}
+    
+    user = presentation.user
+    
+    try:
+        _report_progress(self, 'generating_content', 10)
+        
+        # Generate content using Google Gemini (FREE)
+        ai_content = gemini_service.generate_presentation_content(
+            presentation.topic,
+            presentation.slide_count,
+            use_cache=use_cache,
+            reuse_deck_id=reuse_deck_id,
+            user_id=presentation.user_id
+        )
+        
+        _report_progress(self, 'creating_slides', 60)
+        
+        # Fill in missing image prompts concurrently
+        slides_data = ai_content.get('slides', [])
+        missing_prompts = [slide_data for slide_data in slides_data if not slide_data.get('image_prompt')]
+        with timed('image_prompts'):
+            image_prompts = gemini_service.generate_slide_image_prompts(missing_prompts)
+        for slide_data, image_prompt in zip(missing_prompts, image_prompts):
+            slide_data['image_prompt'] = image_prompt
+        
+        for slide_data in slides_data:
+            # No direct image generation with Gemini, just prompts
+            slide_data['image_url'] = None
+        
+        # Save presentation and slides in a single transaction
+        presentation.title = ai_content.get('title', presentation.title)
+        presentation.description = ai_content.get('description', '')
+        presentation.status = 'completed'
+        with timed('persist'):
+            persistence_service.save_deck(
+                presentation,
+                slides_data,
+                update_fields=['title', 'description', 'status']
+            )
+        
+        return {
+            'presentation_id': presentation_id,
+            'status': presentation.status,
+            'credits_remaining': user.ai_credits
+        }
+        
+    except RateLimitExceeded as limit_error:
+        if self.request.retries < self.max_retries:
+            # Requeue instead of holding the worker until quota frees up
+            raise self.retry(countdown=limit_error.retry_after)
+        
+        presentation.status = 'failed'
+        presentation.save()
+        credit_service.refund(presentation_id)
+        
+        logger.error(f"AI generation failed: {str(limit_error)}")
+        return {
+            'presentation_id': presentation_id,
+            'status': presentation.status,
+            'error': str(limit_error)
+        }
+        
+    except Exception as ai_error:
+        # Update presentation status to failed and give the credit back
+        presentation.status = 'failed'
+        presentation.save()
+        credit_service.refund(presentation_id)
+        
+        logger.error(f"AI generation failed: {str(ai_error)}")
+        return {
+            'presentation_id': presentation_id,
+            'status': presentation.status,
+            'error': str(ai_error)
+        }
@@ -3,7 +3,11 @@ from . import views
 
 urlpatterns = [
     path('', views.generate_presentation, name='generate_presentation'),
+    path('stream/', views.generate_presentation_stream, name='generate_presentation_stream'),
+    path('similar-topics/', views.similar_topics, name='similar_topics'),
+    path('jobs/<uuid:job_id>/', views.generation_status, name='generation_status'),
     path('slide/<uuid:slide_id>/regenerate/', views.regenerate_slide_content, name='regenerate_slide_content'),
+    path('slides/regenerate/', views.regenerate_slides_content, name='regenerate_slides_content'),
     path('presentation/enhance/', views.enhance_presentation, name='enhance_presentation'),
     path('status/', views.ai_status, name='ai_status'),
 ]
@@ -1,112 +1,163 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from apps.authentication.services import InsufficientCredits, credit_service
+from apps.core.timing import timed
 from apps.presentations.models import Presentation, Slide
-from apps.presentations.serializers import PresentationSerializer
-from .services import gemini_service
+from apps.presentations.serializers import PresentationSerializer, SlideSerializer
+from apps.presentations.services import persistence_service
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from celery.result import AsyncResult
+from .services import PROMPT_VERSION, gemini_service
+from .cache import generation_cache
+from .similarity import topic_index
+from .singleflight import generation_flights
+from .ratelimit import RateLimitExceeded
+from .resilience import CircuitOpen
+from .renderers import EventStreamRenderer, format_sse_event
+from .tasks import generate_presentation_task
 import logging
+import math
+import uuid
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Slides accepted by one batch regeneration request (one Gemini call)
+MAX_REGENERATE_SLIDES = 20
+
+def _rate_limited_response(limit_error):
+    """429 response for calls rejected by the shared Gemini rate limiter"""
+    response = Response({
+        'error': 'AI rate limit reached, please try again shortly',
+        'retry_after': round(limit_error.retry_after, 1)
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(math.ceil(limit_error.retry_after))
+    return response
+
+def _unavailable_response(circuit_error):
+    """503 response while every Gemini backend's circuit breaker is open"""
+    response = Response({
+        'error': 'AI service temporarily unavailable, please try again shortly',
+        'retry_after': round(circuit_error.retry_after, 1)
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(max(1, math.ceil(circuit_error.retry_after)))
+    return response
+
+def _validate_generation_request(request):
+    """Validate topic and slide count for a generation request
+    
+    Returns (topic, slide_count, error_response).
+    """
+    # Get request data
+    topic = request.data.get('topic', '').strip()
+    slide_count = request.data.get('slideCount', 5)
+    
+    # Validation
+    if not topic:
+        return topic, slide_count, Response({
+            'error': 'Topic is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not isinstance(slide_count, int) or slide_count < 3 or slide_count > 10:
+        return topic, slide_count, Response({
+            'error': 'Slide count must be between 3 and 10'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return topic, slide_count, None
+
+def _reuse_deck_id(request):
+    """Indexed deck the client chose to reuse, from reuseDeckId
+    
+    Returns (deck_id, error_response).
+    """
+    deck_id = request.data.get('reuseDeckId')
+    if deck_id in (None, ''):
+        return None, None
+    try:
+        return str(uuid.UUID(str(deck_id))), None
+    except ValueError:
+        return None, Response({
+            'error': 'reuseDeckId must be a deck id from similar-topics'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+def _create_charged_presentation(user, topic, slide_count):
+    """Charge one credit and create the generating presentation atomically
+    
+    The credit is refunded if generation later fails. Returns
+    (presentation, error_response).
+    """
+    presentation_id = uuid.uuid4()
+    try:
+        with transaction.atomic():
+            credit_service.reserve(user, reference=presentation_id)
+            presentation = Presentation.objects.create(
+                id=presentation_id,
+                user=user,
+                title=f"Presentation about {topic}",
+                topic=topic,
+                slide_count=slide_count,
+                status='generating'
+            )
+    except InsufficientCredits:
+        return None, Response({
+            'error': 'Insufficient AI credits'
+        }, status=status.HTTP_402_PAYMENT_REQUIRED)
+    return presentation, None
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def generate_presentation(request):
     """Generate a new presentation using Google Gemini AI (FREE)"""
     try:
-        # Get request data
-        topic = request.data.get('topic', '').strip()
-        slide_count = request.data.get('slideCount', 5)
-        
-        # Validation
-        if not topic:
-            return Response({
-                'error': 'Topic is required'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if not isinstance(slide_count, int) or slide_count < 3 or slide_count > 10:
-            return Response({
-                'error': 'Slide count must be between 3 and 10'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Check user credits
+        topic, slide_count, error_response = _validate_generation_request(request)
+        if error_response:
+            return error_response
+        use_cache = request.data.get('useCache', True) is not False
+        reuse_deck_id, error_response = _reuse_deck_id(request)
+        if error_response:
+            return error_response
         user = request.user
-        if user.ai_credits < 1:
-            return Response({
-                'error': 'Insufficient AI credits'
-            }, status=status.HTTP_402_PAYMENT_REQUIRED)
-        
-        # Create presentation record
-        presentation = Presentation.objects.create(
-            user=user,
-            title=f"Presentation about {topic}",
-            topic=topic,
-            slide_count=slide_count,
-            status='generating'
-        )
         
+        # Create presentation record (charges the credit)
+        presentation, error_response = _create_charged_presentation(user, topic, slide_count)
+        if error_response:
+            return error_response
+        
+        # Queue generation; the job id is the presentation id
         try:
-            # Generate content using Google Gemini (FREE)
-            ai_content = gemini_service.generate_presentation_content(topic, slide_count)
-            
-            # Update presentation with generated title and description
-            presentation.title = ai_content.get('title', presentation.title)
-            presentation.description = ai_content.get('description', '')
-            presentation.status = 'completed'
-            presentation.save()
-            
-            # Create slides
-            slides_data = ai_content.get('slides', [])
-            for slide_data in slides_data:
-                # Generate enhanced image prompt using Gemini
-                image_prompt = slide_data.get('image_prompt', '')
-                
-                if not image_prompt:
-                    try:
-                        image_prompt = gemini_service.generate_slide_image_prompt(
-                            slide_data.get('title', ''),
-                            slide_data.get('content', '')
-                        )
-                    except Exception as img_error:
-                        logger.warning(f"Failed to generate image prompt: {str(img_error)}")
-                        image_prompt = f"Professional illustration for {slide_data.get('title', 'slide')}"
-                
-                # Create slide (no direct image generation with Gemini, just prompts)
-                Slide.objects.create(
-                    presentation=presentation,
-                    title=slide_data.get('title', ''),
-                    content=slide_data.get('content', ''),
-                    image_url=None,  # No direct image generation
-                    image_prompt=image_prompt,
-                    slide_number=slide_data.get('slide_number', 1)
+            with timed('enqueue'):
+                generate_presentation_task.apply_async(
+                    args=[str(presentation.id)],
+                    kwargs={'use_cache': use_cache, 'reuse_deck_id': reuse_deck_id},
+                    task_id=str(presentation.id)
                 )
-            
-            # Deduct AI credit
-            user.ai_credits -= 1
-            user.save()
-            
-            # Return the generated presentation
-            serializer = PresentationSerializer(presentation)
-            return Response({
-                'presentation': serializer.data,
-                'message': 'Presentation generated successfully using Google Gemini AI (Free)',
-                'ai_provider': 'Google Gemini (Free)',
-                'credits_remaining': user.ai_credits
-            }, status=status.HTTP_201_CREATED)
-            
-        except Exception as ai_error:
-            # Update presentation status to failed
+        except Exception as queue_error:
             presentation.status = 'failed'
             presentation.save()
+            credit_service.refund(presentation.id)
             
-            logger.error(f"AI generation failed: {str(ai_error)}")
+            logger.error(f"Failed to queue generation: {str(queue_error)}")
             return Response({
-                'error': 'Failed to generate presentation content',
-                'details': str(ai_error)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
+                'error': 'Generation queue unavailable, please try again later'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        return Response({
+            'job_id': str(presentation.id),
+            'presentation_id': str(presentation.id),
+            'status': presentation.status,
+            'status_url': reverse('generation_status', kwargs={'job_id': presentation.id}),
+            'message': 'Presentation generation queued',
+            'ai_provider': 'Google Gemini (Free)',
+            'credits_remaining': user.ai_credits
+        }, status=status.HTTP_202_ACCEPTED)
+    
     except Exception as e:
         logger.error(f"Presentation generation error: {str(e)}")
         return Response({
@@ -114,6 +165,186 @@ def generate_presentation(request):
             'details': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def generate_presentation_stream(request):
+    """Generate a presentation, streaming each slide as Server-Sent Events"""
+    topic, slide_count, error_response = _validate_generation_request(request)
+    if error_response:
+        return error_response
+    use_cache = request.data.get('useCache', True) is not False
+    reuse_deck_id, error_response = _reuse_deck_id(request)
+    if error_response:
+        return error_response
+    
+    # Create presentation record (charges the credit)
+    presentation, error_response = _create_charged_presentation(request.user, topic, slide_count)
+    if error_response:
+        return error_response
+    
+    response = StreamingHttpResponse(
+        _stream_generation_events(presentation, request.user, use_cache, reuse_deck_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+    return response
+
+def _stream_generation_events(presentation, user, use_cache, reuse_deck_id=None):
+    """Persist and emit slides as Gemini produces them"""
+    try:
+        yield format_sse_event('started', {
+            'presentation_id': str(presentation.id),
+            'status': presentation.status
+        })
+        
+        ai_content = {}
+        used_numbers = set()
+        for kind, payload in gemini_service.stream_presentation_content(
+            presentation.topic, presentation.slide_count, use_cache=use_cache, reuse_deck_id=reuse_deck_id,
+            user_id=user.pk
+        ):
+            if kind == 'deck':
+                ai_content = payload
+                continue
+            
+            slide = persistence_service.build_slide(presentation, payload)
+            try:
+                number = int(slide.slide_number)
+            except (TypeError, ValueError):
+                number = 0
+            if number < 1 or number in used_numbers:
+                # Keep slide numbers unique even if Gemini repeats or garbles one
+                number = max(used_numbers, default=0) + 1
+            slide.slide_number = number
+            used_numbers.add(number)
+            slide.save()
+            yield format_sse_event('slide', SlideSerializer(slide).data)
+        
+        # Fill in image prompts Gemini left empty
+        slides = list(presentation.slides.filter(image_prompt=''))
+        with timed('image_prompts'):
+            image_prompts = gemini_service.generate_slide_image_prompts([
+                {'title': slide.title, 'content': slide.content} for slide in slides
+            ])
+        
+        presentation.status = 'completed'
+        persistence_service.update_slides(
+            presentation,
+            {
+                slide.slide_number: {'image_prompt': image_prompt}
+                for slide, image_prompt in zip(slides, image_prompts)
+            },
+            presentation_updates={
+                'title': ai_content.get('title', presentation.title),
+                'description': ai_content.get('description', ''),
+                'status': presentation.status
+            }
+        )
+        
+        yield format_sse_event('complete', {
+            'presentation': PresentationSerializer(presentation).data,
+            'message': 'Presentation generated successfully using Google Gemini AI (Free)',
+            'ai_provider': 'Google Gemini (Free)',
+            'credits_remaining': user.ai_credits
+        })
+    
+    except GeneratorExit:
+        # The client disconnected; an unfinished deck must not stay 'generating'
+        if presentation.status != 'completed':
+            presentation.status = 'failed'
+            presentation.save()
+            credit_service.refund(presentation.id)
+            logger.info(f"Client left during streaming generation of {presentation.id}, credit refunded")
+        raise
+    
+    except RateLimitExceeded as limit_error:
+        presentation.status = 'failed'
+        presentation.save()
+        credit_service.refund(presentation.id)
+        
+        yield format_sse_event('error', {
+            'presentation_id': str(presentation.id),
+            'error': 'AI rate limit reached, please try again shortly',
+            'retry_after': round(limit_error.retry_after, 1)
+        })
+    
+    except Exception as e:
+        presentation.status = 'failed'
+        presentation.save()
+        credit_service.refund(presentation.id)
+        
+        logger.error(f"Streaming generation failed: {str(e)}")
+        yield format_sse_event('error', {
+            'presentation_id': str(presentation.id),
+            'error': 'Failed to generate presentation content'
+        })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def similar_topics(request):
+    """Offer a recent deck for a near-duplicate topic before generating
+    
+    Pass the returned deck_id as reuseDeckId to generate from it without a
+    Gemini call (the credit is still charged).
+    """
+    topic = request.query_params.get('topic', '').strip()
+    try:
+        slide_count = int(request.query_params.get('slideCount', 5))
+    except ValueError:
+        slide_count = 0
+    if not topic:
+        return Response({
+            'error': 'Topic is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if slide_count < 3 or slide_count > 10:
+        return Response({
+            'error': 'Slide count must be between 3 and 10'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    with timed('topic_index'):
+        match = topic_index.find(request.user.pk, topic, slide_count, gemini_service.model_name, PROMPT_VERSION)
+    return Response({
+        'mode': topic_index.mode,
+        'threshold': topic_index.threshold,
+        'match': match.as_dict() if match else None
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def generation_status(request, job_id):
+    """Get progress of a queued presentation generation job"""
+    try:
+        presentation = Presentation.objects.get(id=job_id, user=request.user)
+    except Presentation.DoesNotExist:
+        return Response({
+            'error': 'Job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    data = {
+        'job_id': str(presentation.id),
+        'presentation_id': str(presentation.id),
+        'status': presentation.status,
+    }
+    
+    if presentation.status == 'generating':
+        result = AsyncResult(str(presentation.id))
+        data['state'] = result.state
+        info = result.info if isinstance(result.info, dict) else {}
+        data['stage'] = info.get('stage', 'queued')
+        data['progress'] = info.get('progress', 0)
+    elif presentation.status == 'completed':
+        data['progress'] = 100
+        with timed('serialize'):
+            data['presentation'] = PresentationSerializer(presentation).data
+        data['credits_remaining'] = request.user.ai_credits
+    else:
+        data['progress'] = 100
+        data['error'] = 'Failed to generate presentation content'
+    
+    return Response(data)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def regenerate_slide_content(request, slide_id):
@@ -128,24 +359,8 @@ def regenerate_slide_content(request, slide_id):
         topic = slide.presentation.topic
         slide_title = slide.title
         
-        prompt = f"""
-        Regenerate content for a presentation slide about "{topic}".
-        Current slide title: "{slide_title}"
-        
-        Generate 3 bullet points (maximum 12 words each) that are:
-        - Professional and engaging
-        - Relevant to the topic and title
-        - Different from the current content
-        
-        Return only the bullet points in this format:
-        • Point 1
-        • Point 2  
-        • Point 3
-        """
-        
         try:
-            response = gemini_service.model.generate_content(prompt)
-            new_content = response.text.strip() if response.text else slide.content
+            new_content = gemini_service.regenerate_slide_content(topic, slide_title) or slide.content
             
             # Update slide content
             slide.content = new_content
@@ -155,13 +370,17 @@ def regenerate_slide_content(request, slide_id):
                 'content': new_content,
                 'message': 'Slide content regenerated successfully'
             })
-            
+        
+        except RateLimitExceeded as limit_error:
+            return _rate_limited_response(limit_error)
+        except CircuitOpen as circuit_error:
+            return _unavailable_response(circuit_error)
         except Exception as gen_error:
             logger.error(f"Content regeneration failed: {str(gen_error)}")
             return Response({
                 'error': 'Failed to regenerate content'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
+    
     except Slide.DoesNotExist:
         return Response({
             'error': 'Slide not found'
@@ -172,6 +391,69 @@ def regenerate_slide_content(request, slide_id):
             'error': 'Failed to regenerate slide content'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def regenerate_slides_content(request):
+    """Regenerate several slides of one presentation with a single Gemini call"""
+    slide_ids = request.data.get('slide_ids')
+    if not isinstance(slide_ids, list) or not slide_ids:
+        return Response({
+            'error': 'slide_ids must be a non-empty list'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(slide_ids) > MAX_REGENERATE_SLIDES:
+        return Response({
+            'error': f'At most {MAX_REGENERATE_SLIDES} slides can be regenerated at once'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        slide_ids = list(dict.fromkeys(uuid.UUID(str(slide_id)) for slide_id in slide_ids))
+    except ValueError:
+        return Response({
+            'error': 'slide_ids must be slide ids'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    slides = list(
+        Slide.objects.select_related('presentation')
+        .filter(id__in=slide_ids, presentation__user=request.user)
+        .order_by('slide_number')
+    )
+    if len(slides) != len(slide_ids):
+        return Response({
+            'error': 'Slide not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    if len({slide.presentation_id for slide in slides}) > 1:
+        return Response({
+            'error': 'All slides must belong to the same presentation'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    presentation = slides[0].presentation
+    
+    try:
+        new_content = gemini_service.regenerate_slides_content(presentation.topic, [
+            {'slide_number': slide.slide_number, 'title': slide.title, 'content': slide.content}
+            for slide in slides
+        ])
+    except RateLimitExceeded as limit_error:
+        return _rate_limited_response(limit_error)
+    except CircuitOpen as circuit_error:
+        return _unavailable_response(circuit_error)
+    except Exception as e:
+        logger.error(f"Batch slide regeneration error: {str(e)}")
+        return Response({
+            'error': 'Failed to regenerate slide content'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    with timed('persist'):
+        updated = persistence_service.update_slides(presentation, {
+            slide_number: {'content': content}
+            for slide_number, content in new_content.items()
+        })
+    updated_ids = {slide.id for slide in updated}
+    
+    return Response({
+        'slides': SlideSerializer(updated, many=True).data,
+        'failed': [str(slide.id) for slide in slides if slide.id not in updated_ids],
+        'message': f'Regenerated {len(updated)} of {len(slides)} slides'
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def enhance_presentation(request):
@@ -183,57 +465,77 @@ def enhance_presentation(request):
                 'error': 'presentation_id is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        # Optional subset of slides to enhance
+        slide_numbers = request.data.get('slide_numbers')
+        if slide_numbers is not None and (
+            not isinstance(slide_numbers, list)
+            or not all(isinstance(number, int) for number in slide_numbers)
+        ):
+            return Response({
+                'error': 'slide_numbers must be a list of integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         presentation = Presentation.objects.get(
             id=presentation_id,
             user=request.user
         )
         
         # Prepare current presentation data
-        slides_data = []
-        for slide in presentation.slides.all().order_by('slide_number'):
-            slides_data.append({
-                'slide_number': slide.slide_number,
-                'title': slide.title,
-                'content': slide.content,
-                'image_prompt': slide.image_prompt
-            })
+        slides = presentation.slides.all().order_by('slide_number')
+        if slide_numbers:
+            slides = slides.filter(slide_number__in=slide_numbers)
+        slides = list(slides)
         
         current_data = {
             'title': presentation.title,
-            'description': presentation.description,
-            'slides': slides_data
+            'slides': [
+                {
+                    'slide_number': slide.slide_number,
+                    'title': slide.title,
+                    'content': slide.content,
+                    'image_prompt': slide.image_prompt
+                }
+                for slide in slides
+            ]
         }
+        if not slide_numbers:
+            current_data['description'] = presentation.description
         
         # Enhance using Gemini
         enhanced_data = gemini_service.enhance_presentation_content(current_data)
         
-        # Update presentation
-        presentation.title = enhanced_data.get('title', presentation.title)
-        presentation.description = enhanced_data.get('description', presentation.description)
-        presentation.save()
+        # Persist only the fields Gemini actually changed
+        slide_updates = persistence_service.diff_slide_updates(slides, enhanced_data.get('slides', []))
+        presentation_updates = {}
+        if not slide_numbers:
+            presentation_updates = {
+                field: enhanced_data[field]
+                for field in ('title', 'description')
+                if isinstance(enhanced_data.get(field), str)
+                and enhanced_data[field] != getattr(presentation, field)
+            }
         
-        # Update slides
-        enhanced_slides = enhanced_data.get('slides', [])
-        for enhanced_slide in enhanced_slides:
-            try:
-                slide = presentation.slides.get(slide_number=enhanced_slide.get('slide_number'))
-                slide.title = enhanced_slide.get('title', slide.title)
-                slide.content = enhanced_slide.get('content', slide.content)
-                slide.image_prompt = enhanced_slide.get('image_prompt', slide.image_prompt)
-                slide.save()
-            except Slide.DoesNotExist:
-                continue
+        if slide_updates or presentation_updates:
+            with timed('persist'):
+                persistence_service.update_slides(presentation, slide_updates, presentation_updates)
         
-        serializer = PresentationSerializer(presentation)
+        with timed('serialize'):
+            presentation_data = PresentationSerializer(presentation).data
         return Response({
-            'presentation': serializer.data,
+            'presentation': presentation_data,
+            'changed_slides': sorted(slide_updates),
+            'changed_fields': sum(len(changes) for changes in slide_updates.values()) + len(presentation_updates),
             'message': 'Presentation enhanced successfully'
         })
-        
+    
     except Presentation.DoesNotExist:
         return Response({
             'error': 'Presentation not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except RateLimitExceeded as limit_error:
+        return _rate_limited_response(limit_error)
+    except CircuitOpen as circuit_error:
+        return _unavailable_response(circuit_error)
     except Exception as e:
         logger.error(f"Enhancement error: {str(e)}")
         return Response({
@@ -245,11 +547,16 @@ def enhance_presentation(request):
 def ai_status(request):
     """Get AI service status and user credits"""
     return Response({
-        'ai_provider': 'Google Gemini',
+        'ai_provider': gemini_service.provider.display_name,
         'is_free': True,
-        'gemini_configured': bool(gemini_service.model),
+        'gemini_configured': gemini_service.is_configured,
         'user_credits': request.user.ai_credits,
         'model': gemini_service.model_name,
         'max_tokens': gemini_service.max_tokens,
-        'rate_limit': '15 requests per minute (free tier)'
+        'rate_limit': f'{settings.GEMINI_RATE_LIMIT_RPM} requests per minute (free tier)',
+        'quota': gemini_service.rate_limit_status(),
+        'backends': gemini_service.backend_status(),
+        'generation_cache': generation_cache.stats(),
+        'single_flight': generation_flights.backend,
+        'topic_reuse': {'mode': topic_index.mode, 'threshold': topic_index.threshold}
     })
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, UserSession
+from .models import CreditTransaction, User, UserSession
+from .services import credit_service
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -14,6 +15,27 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('name', 'avatar', 'is_premium', 'ai_credits')
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            super().save_model(request, obj, form, change)
+            credit_service.open_account(obj)
+            return
+        
+        # ai_credits is never written from the form: the value loaded with the
+        # page is stale once a generation reserves or refunds credits, so an
+        # edit is applied as a ledger adjustment of the difference instead
+        delta = 0
+        if 'ai_credits' in form.changed_data:
+            delta = obj.ai_credits - form.initial['ai_credits']
+        obj.save(update_fields=[
+            field.name for field in obj._meta.concrete_fields
+            if not field.primary_key and field.name != 'ai_credits'
+        ])
+        if delta:
+            credit_service.grant(obj, delta, kind='adjustment', reference=f'admin:{request.user.pk}')
+        else:
+            obj.refresh_from_db(fields=['ai_credits'])
 
 @admin.register(UserSession)
 class UserSessionAdmin(admin.ModelAdmin):
@@ -21,3 +43,19 @@ class UserSessionAdmin(admin.ModelAdmin):
     list_filter = ('is_active', 'created_at')
     search_fields = ('user__email', 'ip_address')
     readonly_fields = ('created_at',)
+
+@admin.register(CreditTransaction)
+class CreditTransactionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'amount', 'balance_after', 'reference', 'created_at')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('user__email', 'reference')
+    readonly_fields = ('user', 'kind', 'amount', 'balance_after', 'reference', 'created_at')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
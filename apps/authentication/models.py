@@ -42,3 +42,53 @@ class UserSession(models.Model):
     
     def __str__(self):
         return f"{self.user.email} - {self.created_at}"
+
+class CreditTransaction(models.Model):
+    """Append-only ledger of AI credit changes
+    
+    Every change to User.ai_credits writes one row here, so a balance can
+    be audited and reconciled from its history.
+    """
+    KIND_CHOICES = [
+        ('charge', 'Charge'),
+        ('refund', 'Refund'),
+        ('grant', 'Grant'),
+        ('adjustment', 'Adjustment'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='credit_transactions')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.IntegerField()
+    balance_after = models.IntegerField()
+    # What the credits were spent on or returned for (e.g. a presentation id)
+    reference = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'credit_transactions'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='credit_user_created_idx'),
+        ]
+        constraints = [
+            # A generation is charged and refunded at most once
+            models.UniqueConstraint(
+                fields=['reference', 'kind'],
+                condition=models.Q(kind__in=['charge', 'refund']) & ~models.Q(reference=''),
+                name='credit_unique_charge_refund'
+            ),
+        ]
+        verbose_name = 'Credit Transaction'
+        verbose_name_plural = 'Credit Transactions'
+    
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.amount:+d}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Credit transactions are append-only")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Credit transactions are append-only")
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from .models import User
+from .services import credit_service
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """User registration serializer"""
@@ -25,6 +26,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             name=validated_data.get('name', ''),
             password=validated_data['password']
         )
+        credit_service.open_account(user)
         return user
 
 class UserLoginSerializer(serializers.Serializer):
@@ -60,3 +62,11 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('name', 'avatar')
+    
+    def update(self, instance, validated_data):
+        # Write only the edited columns: a full save would put back the
+        # ai_credits read with request.user and undo concurrent reservations
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
@@ -0,0 +1,93 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from typing import Optional
+from .models import CreditTransaction, User
+import logging
+
+logger = logging.getLogger(__name__)
+
+class InsufficientCredits(Exception):
+    """The user has fewer credits than the operation needs"""
+
+class CreditService:
+    """Moves AI credits with conditional UPDATEs and records each move in the ledger
+    
+    Balances are changed with a single UPDATE ... SET ai_credits =
+    ai_credits - n WHERE ai_credits >= n, so parallel requests from one
+    account never read-modify-write the user row or overdraw it.
+    """
+    
+    def reserve(self, user, amount: int = 1, reference: str = '') -> int:
+        """Charge credits up front; returns the new balance
+        
+        Raises InsufficientCredits when the balance is too low.
+        """
+        with transaction.atomic():
+            updated = User.objects.filter(pk=user.pk, ai_credits__gte=amount).update(
+                ai_credits=F('ai_credits') - amount
+            )
+            if not updated:
+                raise InsufficientCredits()
+            balance = self._record(user.pk, 'charge', -amount, reference)
+        
+        user.ai_credits = balance
+        return balance
+    
+    def refund(self, reference: str) -> Optional[int]:
+        """Return the credits charged for a reference (e.g. a failed generation)
+        
+        Each charge is refunded at most once; returns the new balance, or
+        None if nothing was charged or it was already refunded.
+        """
+        charge = CreditTransaction.objects.filter(reference=str(reference), kind='charge').first()
+        if charge is None:
+            return None
+        
+        try:
+            with transaction.atomic():
+                User.objects.filter(pk=charge.user_id).update(ai_credits=F('ai_credits') - charge.amount)
+                balance = self._record(charge.user_id, 'refund', -charge.amount, reference)
+        except IntegrityError:
+            logger.info(f"Credits for {reference} were already refunded")
+            return None
+        
+        logger.info(f"Refunded {-charge.amount} credit(s) for {reference}")
+        return balance
+    
+    def grant(self, user, amount: int, kind: str = 'grant', reference: str = '') -> int:
+        """Add (or, with a negative amount and kind='adjustment', remove) credits"""
+        with transaction.atomic():
+            User.objects.filter(pk=user.pk).update(ai_credits=F('ai_credits') + amount)
+            balance = self._record(user.pk, kind, amount, reference)
+        
+        user.ai_credits = balance
+        return balance
+    
+    def open_account(self, user) -> int:
+        """Record a new user's starting balance as an opening 'grant'
+        
+        Called once when the account is created so that the ledger sums
+        to ai_credits from the first row on.
+        """
+        with transaction.atomic():
+            balance = User.objects.filter(pk=user.pk).values_list('ai_credits', flat=True).get()
+            if balance:
+                self._record(user.pk, 'grant', balance, 'signup')
+        
+        user.ai_credits = balance
+        return balance
+    
+    def _record(self, user_id, kind: str, amount: int, reference: str) -> int:
+        """Write the ledger row for a balance change made in this transaction"""
+        # The UPDATE above holds the row lock, so this reads our own change
+        balance = User.objects.filter(pk=user_id).values_list('ai_credits', flat=True).get()
+        CreditTransaction.objects.create(
+            user_id=user_id,
+            kind=kind,
+            amount=amount,
+            balance_after=balance,
+            reference=str(reference)
+        )
+        return balance
+
+credit_service = CreditService()
@@ -0,0 +1,320 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+import contextlib
+import datetime
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+# Deck sizes used by the serialization cases
+SERIALIZER_DECK_SIZES = (10, 100, 1000)
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class StubGeminiModel:
+    """Deterministic stand-in for the Gemini model
+    
+    mode is 'json' (valid JSON), 'fenced' (JSON inside markdown fences)
+    or 'invalid' (unparseable text, which triggers the fallback deck).
+    """
+    
+    def __init__(self, slide_count: int = 10):
+        self.slide_count = slide_count
+        self.mode = 'json'
+    
+    def generate_content(self, prompt: str, **kwargs) -> StubResponse:
+        if self.mode == 'invalid':
+            return StubResponse('Sorry, I cannot produce JSON for that topic right now.')
+        payload = json.dumps({
+            'title': 'Benchmark deck',
+            'description': 'Deck returned by the stubbed Gemini model',
+            'slides': [
+                {
+                    'slide_number': number,
+                    'title': f'Key point {number}',
+                    'content': '• First key point\n• Second key point\n• Third key point',
+                    'image_prompt': f'Illustration for key point {number}',
+                }
+                for number in range(1, self.slide_count + 1)
+            ],
+        }, indent=2)
+        if self.mode == 'fenced':
+            payload = f"```json\n{payload}\n```"
+        return StubResponse(payload)
+
+def make_image(width: int = 640, height: int = 480) -> bytes:
+    """Noise JPEG so image embedding is not flattered by compression"""
+    from PIL import Image
+    image = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=90)
+    return output.getvalue()
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        'min_ms': round(ordered[0], 3),
+        'median_ms': round(statistics.median(ordered), 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p95_ms': round(ordered[math.ceil(len(ordered) * 0.95) - 1], 3),
+        'max_ms': round(ordered[-1], 3),
+        'stdev_ms': round(statistics.stdev(ordered), 3) if len(ordered) > 1 else 0.0,
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark generation parsing, topic indexing, slide persistence, serializers and exports '
+        'against a throwaway test database with a stubbed Gemini model'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Timed runs per case (heavy cases run at least 3)')
+        parser.add_argument('--output', default='benchmark-results.json',
+                            help='Path of the JSON results file ("-" for stdout only)')
+        parser.add_argument('--filter', default='',
+                            help='Only run cases whose name contains this text')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Reuse the test database between runs')
+    
+    def handle(self, *args, **options):
+        self.iterations = max(1, options['iterations'])
+        self.name_filter = options['filter']
+        self.results = []
+        
+        # Benchmarks never touch the configured database's data
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False)
+        try:
+            with self._stubbed_services():
+                self._run_cases()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+        
+        report = {
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': connection.vendor,
+            'iterations': self.iterations,
+            'results': self.results,
+        }
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(self.results)} results to {options['output']}"))
+    
+    @contextlib.contextmanager
+    def _stubbed_services(self):
+        """Route Gemini calls to the stub model and image downloads to generated images
+        
+        Bypasses the rate limiter and the topic index writes so only parsing
+        and fallback work is timed; indexing has cases of its own.
+        """
+        from apps.ai_generator.services import GeminiService
+        from apps.ai_generator.similarity import topic_index
+        from apps.exports.images import image_fetcher
+        
+        self.stub_model = StubGeminiModel()
+        self.images = {}
+        
+        def generate_content(service, prompt, max_wait=None, **kwargs):
+            return self.stub_model.generate_content(prompt, **kwargs)
+        
+        def prefetch(urls):
+            return {url: self.images.get(url) for url in urls if url}
+        
+        # The fallback case would log an error on every iteration
+        logging.disable(logging.ERROR)
+        try:
+            with mock.patch.object(GeminiService, '_generate_content', generate_content), \
+                    mock.patch.object(topic_index, 'add', lambda *args, **kwargs: None), \
+                    mock.patch.object(image_fetcher, 'prefetch', prefetch):
+                yield
+        finally:
+            logging.disable(logging.NOTSET)
+    
+    def _run_cases(self):
+        from apps.authentication.models import User
+        self.user = User.objects.create_user(
+            username='benchmark', email='benchmark@example.com', password='benchmark'
+        )
+        
+        self._generation_cases()
+        self._topic_index_cases()
+        self._persistence_cases()
+        self._serializer_cases()
+        self._export_cases()
+    
+    # Cases
+    
+    def _generation_cases(self):
+        from apps.ai_generator.services import gemini_service
+        
+        for mode, name in (('json', 'generation.parse_json'),
+                           ('fenced', 'generation.parse_fenced_json'),
+                           ('invalid', 'generation.fallback')):
+            def run(mode=mode):
+                self.stub_model.mode = mode
+                return gemini_service.generate_presentation_content('Benchmarking Django', 10, use_cache=False)
+            self._bench(name, run, params={'slides': 10})
+        self.stub_model.mode = 'json'
+    
+    def _topic_index_cases(self):
+        from apps.ai_generator.services import gemini_service
+        from apps.ai_generator.similarity import TopicIndex, topic_index
+        
+        content = gemini_service._create_fallback_content('Benchmarking Django', 10)
+        topics = (f'Benchmarking Django part {number}' for number in itertools.count())
+        params = {'slides': 10, 'mode': topic_index.mode}
+        # Through the class: _stubbed_services patches the instance's add
+        self._bench(
+            'topic_index.add',
+            lambda: TopicIndex.add(topic_index, self.user.pk, next(topics), 10, 'benchmark', 'v1', content),
+            params=params
+        )
+        self._bench(
+            'topic_index.find',
+            lambda: topic_index.find(self.user.pk, 'Benchmarking Django parts', 10, 'benchmark', 'v1'),
+            params=params
+        )
+    
+    def _persistence_cases(self):
+        from apps.presentations.services import persistence_service
+        
+        for slide_count in (10, 100):
+            presentation = self._create_presentation(0, title=f'Persistence {slide_count}')
+            slides_data = [
+                {'slide_number': number, 'title': f'Slide {number}', 'content': 'Content', 'image_prompt': 'Prompt'}
+                for number in range(1, slide_count + 1)
+            ]
+            self._bench(
+                'persistence.save_deck',
+                lambda: persistence_service.save_deck(presentation, slides_data, update_fields=['title']),
+                params={'slides': slide_count}
+            )
+    
+    def _serializer_cases(self):
+        from apps.presentations.models import Presentation
+        from apps.presentations.serializers import PresentationListSerializer, PresentationSerializer
+        
+        for slide_count in SERIALIZER_DECK_SIZES:
+            presentation = self._create_presentation(slide_count)
+            self._bench(
+                'serializer.presentation_detail',
+                lambda: PresentationSerializer(
+                    Presentation.objects.prefetch_related('slides').get(id=presentation.id)
+                ).data,
+                params={'slides': slide_count},
+                iterations=max(3, self.iterations // 4) if slide_count >= 1000 else None
+            )
+        
+        # Enough decks for a few full list pages
+        for index in range(60):
+            self._create_presentation(10, title=f'List deck {index}')
+        for page_size in (20, 100):
+            self._bench(
+                'serializer.presentation_list_page',
+                lambda: PresentationListSerializer(
+                    Presentation.objects.filter(user=self.user)
+                    .annotate(slide_count_actual=Count('slides'))
+                    .order_by('-created_at', '-id')[:page_size],
+                    many=True
+                ).data,
+                params={'page_size': page_size}
+            )
+    
+    def _export_cases(self):
+        from apps.presentations.models import Presentation
+        from apps.exports.services import pdf_service, pptx_service
+        
+        plain = self._create_presentation(10, title='Export deck')
+        illustrated = self._create_presentation(10, title='Illustrated deck', with_images=True)
+        for with_images, presentation in ((False, plain), (True, illustrated)):
+            presentation = Presentation.objects.prefetch_related('slides').get(id=presentation.id)
+            for name, render in (('export.pptx', pptx_service.create_pptx),
+                                 ('export.pdf', pdf_service.create_pdf)):
+                self._bench(
+                    name,
+                    lambda: render(presentation).close(),
+                    params={'slides': 10, 'images': with_images},
+                    iterations=max(3, self.iterations // 2)
+                )
+    
+    # Helpers
+    
+    def _create_presentation(self, slide_count: int, title: str = 'Benchmark deck', with_images: bool = False):
+        from apps.presentations.models import Presentation, Slide
+        
+        presentation = Presentation.objects.create(
+            user=self.user, title=title, description='Benchmark presentation',
+            topic='Benchmarking', slide_count=slide_count, status='completed'
+        )
+        slides = []
+        for number in range(1, slide_count + 1):
+            image_url = None
+            if with_images:
+                image_url = f'https://images.example.com/{presentation.id}/{number}.jpg'
+                self.images[image_url] = make_image()
+            slides.append(Slide(
+                presentation=presentation, slide_number=number, title=f'Slide {number}',
+                content='• First key point\n• Second key point\n• Third key point',
+                image_prompt='Prompt', image_url=image_url
+            ))
+        Slide.objects.bulk_create(slides)
+        return presentation
+    
+    def _bench(self, name: str, func: Callable[[], Any], params: Optional[Dict[str, Any]] = None,
+               iterations: Optional[int] = None) -> None:
+        """Time func after one warm-up call and record the summary"""
+        if self.name_filter and self.name_filter not in name:
+            return
+        
+        iterations = iterations or self.iterations
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        
+        result = {
+            'name': name,
+            'params': params or {},
+            'iterations': iterations,
+            'queries': len(queries),
+            **summarize(timings),
+        }
+        self.results.append(result)
+        label = ' '.join(f'{key}={value}' for key, value in result['params'].items())
+        self.stdout.write(
+            f"{name:34} {label:24} median {result['median_ms']:9.3f} ms   "
+            f"p95 {result['p95_ms']:9.3f} ms   queries {result['queries']}"
+        )
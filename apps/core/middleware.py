@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import connection
+from .metrics import request_duration, request_queries
+from .timing import RequestTimings, current_timings
+import time
+
+class ServerTimingMiddleware:
+    """Record request duration and DB queries, and report stages in Server-Timing
+    
+    Stages timed with apps.core.timing.timed() while the view runs show up
+    in the header. For streamed responses only the work done before the
+    first byte is included.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header_enabled = settings.SERVER_TIMING_ENABLED
+    
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            with connection.execute_wrapper(timings.queries):
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        
+        match = getattr(request, 'resolver_match', None)
+        # The route name keeps label cardinality bounded (no ids in paths)
+        view = match.view_name if match and match.view_name else 'unmatched'
+        request_duration.observe(
+            time.perf_counter() - timings.started_at,
+            method=request.method, view=view, status=response.status_code
+        )
+        request_queries.observe(timings.queries.count, method=request.method, view=view)
+        
+        if self.header_enabled:
+            response['Server-Timing'] = timings.server_timing()
+        return response
@@ -0,0 +1,16 @@
+from django.conf import settings
+import redis
+
+_clients = {}
+
+def get_redis_client(url=None):
+    """Return a shared Redis client (one connection pool per URL per process)"""
+    url = url or settings.REDIS_URL
+    if url not in _clients:
+        _clients[url] = redis.Redis.from_url(
+            url,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+            health_check_interval=30
+        )
+    return _clients[url]
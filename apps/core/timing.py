@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connection
+from typing import Dict, Iterator, List, Optional
+import re
+import time
+from .metrics import stage_duration, stage_queries
+
+class QueryCounter:
+    """connection.execute_wrapper that counts queries and the time spent in them"""
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+class RequestTimings:
+    """Stage timings collected while one request is handled"""
+    
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self.queries = QueryCounter()
+        self.started_at = time.perf_counter()
+    
+    def add(self, stage: str, seconds: float, queries: int) -> None:
+        entry = self.stages.setdefault(stage, [0.0, 0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+        entry[2] += queries
+    
+    def server_timing(self) -> str:
+        """Server-Timing header value: one metric per stage, then db and total"""
+        metrics = []
+        for stage, (seconds, calls, queries) in self.stages.items():
+            details = []
+            if calls > 1:
+                details.append(f"{calls} calls")
+            if queries:
+                details.append(_queries_label(queries))
+            desc = f';desc="{", ".join(details)}"' if details else ''
+            metrics.append(f"{_metric_name(stage)};dur={seconds * 1000:.1f}{desc}")
+        metrics.append(f'db;dur={self.queries.duration * 1000:.1f};desc="{_queries_label(self.queries.count)}"')
+        metrics.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ', '.join(metrics)
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar('current_timings', default=None)
+
+def _queries_label(count: int) -> str:
+    return f"{count} query" if count == 1 else f"{count} queries"
+
+def _metric_name(stage: str) -> str:
+    # Server-Timing metric names are HTTP tokens
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', stage)
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a block and count its DB queries
+    
+    Observations go to the stage histograms and, inside a request, to the
+    Server-Timing header. Queries are counted on this thread's connection.
+    """
+    counter = QueryCounter()
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(counter):
+            yield
+    finally:
+        seconds = time.perf_counter() - start
+        stage_duration.observe(seconds, stage=stage)
+        stage_queries.observe(counter.count, stage=stage)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add(stage, seconds, counter.count)
@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('', views.health_check, name='health_check'),
     path('status/', views.status_check, name='status_check'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
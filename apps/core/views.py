@@ -3,7 +3,31 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from .metrics import registry
+import logging
 import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Process start, reported as uptime
+STARTED_AT = time.monotonic()
+
+def _check_database():
+    """Run a trivial query; returns (connected, latency in ms)"""
+    start = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except Exception as e:
+        logger.error(f"Database health check failed: {str(e)}")
+        return False, None
+    return True, round((time.perf_counter() - start) * 1000, 2)
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -21,14 +45,28 @@ def health_check(request):
 @permission_classes([AllowAny])
 def status_check(request):
     """Detailed status check with system information"""
+    database_connected, database_latency_ms = _check_database()
+    
     return Response({
-        'status': 'operational',
+        'status': 'operational' if database_connected else 'degraded',
         'service': 'SlideCraft AI Backend',
         'version': '1.0.0',
         'debug': settings.DEBUG,
-        'database': 'connected',
+        'database': 'connected' if database_connected else 'unavailable',
+        'database_latency_ms': database_latency_ms,
+        'uptime_seconds': round(time.monotonic() - STARTED_AT),
         'ai_provider': 'Google Gemini',
         'gemini_configured': bool(settings.GEMINI_API_KEY),
         'is_free_ai': True,
         'allowed_hosts': settings.ALLOWED_HOSTS,
-    })
+    }, status=status.HTTP_200_OK if database_connected else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+@require_GET
+def metrics(request):
+    """Prometheus metrics for this worker process"""
+    if settings.METRICS_TOKEN:
+        authorization = request.headers.get('Authorization', '')
+        if not constant_time_compare(authorization, f'Bearer {settings.METRICS_TOKEN}'):
+            return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class ExportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.exports'
+    
+    def ready(self):
+        # Register render cache invalidation handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,57 @@
+from typing import Iterable, Iterator, Tuple, BinaryIO
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+class ZipStreamBuffer:
+    """Write-only sink for ZipFile that hands bytes off as soon as they are written
+    
+    Has no seek/tell, so ZipFile writes data descriptors instead of seeking
+    back into the archive, which keeps the output streamable.
+    """
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_zip(entries: Iterable[Tuple[str, BinaryIO]]) -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk from (name, file) pairs
+    
+    Entries are consumed lazily, so only one file is held at a time.
+    Files are stored uncompressed: PPTX and PDF are already compressed.
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for name, file_obj in entries:
+            try:
+                with archive.open(name, mode='w', force_zip64=True) as entry:
+                    while True:
+                        chunk = file_obj.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        entry.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+            finally:
+                file_obj.close()
+            
+            data = buffer.drain()
+            if data:
+                yield data
+    
+    # Central directory
+    data = buffer.drain()
+    if data:
+        yield data
@@ -0,0 +1,183 @@
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import storages
+from typing import Callable, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bump when exporter output changes so previously rendered files are not served
+RENDERER_VERSION = '2'
+
+# An over-budget cache is trimmed to this share of its limit, so the next
+# writes fit without another scan
+EVICT_LOW_WATER = 0.9
+
+class EvictionSchedule:
+    """Decides when a size-capped cache needs a full eviction scan
+    
+    Keeps a running total of the cache size, so a write costs O(1)
+    instead of listing every entry. The scan runs on the first write in a
+    process, when the total may exceed max_bytes, and at least every
+    `interval` seconds to pick up what other processes wrote.
+    """
+    
+    def __init__(self, max_bytes: int, interval: float):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._size = None
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+        self._scanning = threading.Lock()
+    
+    def record_write(self, size: int, scan: Callable[[], int]) -> None:
+        """Account for `size` new bytes and run `scan` if due
+        
+        `scan` evicts and returns the bytes left in the cache.
+        """
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+                if self._size <= self.max_bytes and time.monotonic() - self._scanned_at < self.interval:
+                    return
+        # One scan at a time; a concurrent writer is covered by it
+        if not self._scanning.acquire(blocking=False):
+            return
+        try:
+            remaining = scan()
+            with self._lock:
+                self._size = remaining
+                self._scanned_at = time.monotonic()
+        finally:
+            self._scanning.release()
+
+class RenderCache:
+    """Cache of rendered export files keyed on a fingerprint of the deck content
+    
+    Files live at <presentation_id>/<fingerprint>.<extension> in the
+    export_cache storage. Editing a deck changes its fingerprint, and
+    saving a new render removes older renders of the same deck.
+    """
+    
+    def __init__(self, alias: str = 'export_cache'):
+        self.alias = alias
+        self.enabled = settings.EXPORT_CACHE_ENABLED
+        self.max_bytes = settings.EXPORT_CACHE_MAX_BYTES
+        self.schedule = EvictionSchedule(self.max_bytes, settings.EXPORT_CACHE_EVICT_INTERVAL)
+    
+    @property
+    def storage(self):
+        return storages[self.alias]
+    
+    def fingerprint(self, presentation, variant: str = '') -> str:
+        """Hash everything that affects the rendered output of a deck
+        
+        `variant` distinguishes renders of the same content, e.g. templates.
+        """
+        # slides.all() is ordered by slide_number and reuses prefetched slides
+        slides = [
+            (slide.slide_number, slide.title, slide.content, slide.image_url,
+             slide.background_color, slide.text_color)
+            for slide in presentation.slides.all()
+        ]
+        payload = json.dumps({
+            'renderer': RENDERER_VERSION,
+            'variant': variant,
+            'title': presentation.title,
+            'description': presentation.description,
+            'slides': slides,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def open(self, presentation_id, fingerprint: str, extension: str) -> Optional[File]:
+        """Open a cached render, or return None on a miss"""
+        if not self.enabled:
+            return None
+        name = self._name(presentation_id, fingerprint, extension)
+        try:
+            if not self.storage.exists(name):
+                return None
+            self._touch(name)
+            return self.storage.open(name, 'rb')
+        except Exception as e:
+            logger.warning(f"Export cache read failed: {str(e)}")
+            return None
+    
+    def save(self, presentation_id, fingerprint: str, extension: str, stream) -> None:
+        """Store a rendered file and drop older renders of the same deck"""
+        if not self.enabled:
+            return
+        name = self._name(presentation_id, fingerprint, extension)
+        try:
+            self._delete_renders(presentation_id, extension, keep=name)
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
+            stream.seek(0)
+            self.storage.save(name, File(stream))
+            self.schedule.record_write(size, self._evict)
+        except Exception as e:
+            logger.warning(f"Export cache write failed: {str(e)}")
+        finally:
+            stream.seek(0)
+    
+    def invalidate(self, presentation_id) -> None:
+        """Remove every cached render of a deck"""
+        if not self.enabled:
+            return
+        try:
+            self._delete_renders(presentation_id)
+        except Exception as e:
+            logger.warning(f"Export cache invalidation failed: {str(e)}")
+    
+    def _name(self, presentation_id, fingerprint: str, extension: str) -> str:
+        return f"{presentation_id}/{fingerprint}.{extension}"
+    
+    def _delete_renders(self, presentation_id, extension: Optional[str] = None,
+                        keep: Optional[str] = None) -> None:
+        directory = str(presentation_id)
+        if not self.storage.exists(directory):
+            return
+        _, files = self.storage.listdir(directory)
+        for filename in files:
+            name = f"{directory}/{filename}"
+            if name == keep or (extension and not filename.endswith(f".{extension}")):
+                continue
+            self.storage.delete(name)
+    
+    def _touch(self, name: str) -> None:
+        """Refresh the modification time so eviction is least-recently-used"""
+        try:
+            os.utime(self.storage.path(name))
+        except NotImplementedError:
+            pass
+    
+    def _evict(self) -> int:
+        """Delete least recently used renders once the cache exceeds max_bytes
+        
+        Lists and stats every render, so it only runs when the eviction
+        schedule says so. Returns the bytes still cached.
+        """
+        entries = []
+        directories, _ = self.storage.listdir('')
+        for directory in directories:
+            _, files = self.storage.listdir(directory)
+            for filename in files:
+                name = f"{directory}/{filename}"
+                entries.append((self.storage.get_modified_time(name), self.storage.size(name), name))
+        
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return total
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes * EVICT_LOW_WATER:
+                break
+            self.storage.delete(name)
+            total -= size
+        return total
+
+render_cache = RenderCache()
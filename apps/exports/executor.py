@@ -0,0 +1,200 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from apps.core.metrics import registry
+from apps.core.timing import timed
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+import atexit
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Slide attributes the exporters read
+SNAPSHOT_SLIDE_FIELDS = ('slide_number', 'title', 'content', 'image_url', 'background_color', 'text_color')
+
+class SnapshotSlides(list):
+    """List of snapshot slides that quacks like the slides related manager"""
+    
+    def all(self):
+        return self
+
+def snapshot_presentation(presentation) -> Dict[str, Any]:
+    """Plain-data copy of everything the exporters read from a deck"""
+    return {
+        'id': str(presentation.id),
+        'title': presentation.title,
+        'description': presentation.description,
+        'slides': [
+            {field: getattr(slide, field) for field in SNAPSHOT_SLIDE_FIELDS}
+            for slide in presentation.slides.all()
+        ],
+    }
+
+def snapshot_template(template) -> Optional[Dict[str, Any]]:
+    """Plain-data copy of a presentation template, or None"""
+    if template is None:
+        return None
+    return {'id': str(template.id), 'template_data': template.template_data}
+
+def restore_presentation(snapshot: Dict[str, Any]) -> SimpleNamespace:
+    """Rebuild an object the exporters can render from a deck snapshot"""
+    return SimpleNamespace(
+        id=snapshot['id'],
+        title=snapshot['title'],
+        description=snapshot['description'],
+        slides=SnapshotSlides(SimpleNamespace(**slide) for slide in snapshot['slides'])
+    )
+
+def render_snapshot(extension: str, snapshot: Dict[str, Any],
+                    template_snapshot: Optional[Dict[str, Any]] = None):
+    """Render a deck snapshot with the export services and return the output file"""
+    from .services import pdf_service, pptx_service
+    
+    presentation = restore_presentation(snapshot)
+    if extension == 'pptx':
+        template = SimpleNamespace(**template_snapshot) if template_snapshot else None
+        return pptx_service.create_pptx(presentation, template)
+    if extension == 'pdf':
+        return pdf_service.create_pdf(presentation)
+    raise ValueError(f"Unsupported export format: {extension}")
+
+def _init_worker():
+    """Set up Django in a freshly spawned render process"""
+    import django
+    django.setup()
+
+def _render_to_path(extension: str, snapshot: Dict[str, Any],
+                    template_snapshot: Optional[Dict[str, Any]] = None) -> str:
+    """Render in a worker process and return the path of a temporary output file"""
+    with render_snapshot(extension, snapshot, template_snapshot) as output:
+        output.seek(0)
+        with tempfile.NamedTemporaryFile(prefix='export-', suffix=f'.{extension}', delete=False) as target:
+            shutil.copyfileobj(output, target)
+    return target.name
+
+def _discard_output(future) -> None:
+    """Delete the output file of a render nobody is waiting for anymore"""
+    try:
+        os.unlink(future.result())
+    except Exception:
+        pass
+
+class RenderExecutor:
+    """Runs CPU-bound PPTX/PDF rendering in a pool of worker processes
+    
+    Views hand over a plain-data snapshot of the deck, so rendering never
+    holds the GIL of the request process. With max_workers=0 rendering
+    happens inline in the calling thread.
+    """
+    
+    def __init__(self, max_workers: int, timeout: float, start_method: str = 'spawn'):
+        self.max_workers = max(0, max_workers)
+        self.timeout = timeout
+        self.start_method = start_method
+        self._pool = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+    
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Process pool, started on first use"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context(self.start_method),
+                        initializer=_init_worker
+                    )
+                    atexit.register(self._reset_pool)
+        return self._pool
+    
+    def render(self, extension: str, presentation, template=None):
+        """Render a deck and return a readable file positioned at the start"""
+        snapshot = snapshot_presentation(presentation)
+        template_snapshot = snapshot_template(template)
+        
+        if not self.max_workers:
+            with timed(f'render_{extension}'):
+                return render_snapshot(extension, snapshot, template_snapshot)
+        
+        with self._lock:
+            self._in_flight += 1
+            queue_depth = max(0, self._in_flight - self.max_workers)
+        if queue_depth:
+            logger.info(f"Export render queued behind {queue_depth} other render(s)")
+        
+        try:
+            future = self.pool.submit(_render_to_path, extension, snapshot, template_snapshot)
+            try:
+                # Includes time spent waiting for a free worker
+                with timed(f'render_{extension}'):
+                    path = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                if not future.cancel():
+                    # Still rendering; drop its output whenever it finishes
+                    future.add_done_callback(_discard_output)
+                raise TimeoutError(f"Rendering {extension} did not finish within {self.timeout}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM kill); start a fresh pool for the next render
+            self._reset_pool()
+            self._record(failed=True)
+            raise
+        except Exception:
+            self._record(failed=True)
+            raise
+        
+        self._record(failed=False)
+        output = open(path, 'rb')
+        # The open handle keeps the data readable until the response closes it
+        os.unlink(path)
+        return output
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, renders in flight and how many are waiting for a worker"""
+        with self._lock:
+            return {
+                'mode': 'process' if self.max_workers else 'inline',
+                'max_workers': self.max_workers,
+                'in_flight': self._in_flight,
+                'queue_depth': max(0, self._in_flight - self.max_workers) if self.max_workers else 0,
+                'completed': self._completed,
+                'failed': self._failed,
+            }
+    
+    def _record(self, failed: bool) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+    
+    def _reset_pool(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+render_executor = RenderExecutor(
+    max_workers=settings.EXPORT_RENDER_WORKERS,
+    timeout=settings.EXPORT_RENDER_TIMEOUT,
+    start_method=settings.EXPORT_RENDER_START_METHOD
+)
+
+registry.gauge(
+    'slidecraft_export_render_queue_depth', 'Export renders waiting for a free worker process',
+    lambda: render_executor.stats()['queue_depth']
+)
+registry.gauge(
+    'slidecraft_export_renders_in_flight', 'Export renders running or queued',
+    lambda: render_executor.stats()['in_flight']
+)
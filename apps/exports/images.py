@@ -0,0 +1,202 @@
+from django.conf import settings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from requests.adapters import HTTPAdapter
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import requests
+from .cache import EVICT_LOW_WATER, EvictionSchedule
+
+logger = logging.getLogger(__name__)
+
+class ImageFetcher:
+    """Downloads slide images for exports with pooling, caching and parallel prefetch
+    
+    Image bytes are stored content-addressed under <cache_dir>/blobs and
+    looked up through a URL index in <cache_dir>/urls. URLs that failed
+    are remembered in <cache_dir>/failed for negative_ttl seconds, so
+    every worker on the host skips them. Eviction also drops index entries
+    of evicted blobs and expired failure markers.
+    """
+    
+    def __init__(self, cache_dir, max_bytes: int, timeout: float, max_workers: int,
+                 negative_ttl: int, max_image_bytes: int, evict_interval: float = 300.0):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.schedule = EvictionSchedule(max_bytes, evict_interval)
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.negative_ttl = negative_ttl
+        self.max_image_bytes = max_image_bytes
+        self._session = None
+        self._session_lock = threading.Lock()
+    
+    @property
+    def session(self) -> requests.Session:
+        """Keep-alive session shared by all downloads in this process"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+    
+    def prefetch(self, urls: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Fetch all distinct URLs in parallel; failed downloads map to None"""
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        if not unique_urls:
+            return {}
+        if len(unique_urls) == 1:
+            return {unique_urls[0]: self.fetch(unique_urls[0])}
+        
+        workers = min(self.max_workers, len(unique_urls))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export-image') as executor:
+            return dict(zip(unique_urls, executor.map(self.fetch, unique_urls)))
+    
+    def fetch(self, url: str) -> Optional[bytes]:
+        """Return image bytes from the cache or the network, or None"""
+        url_key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        
+        cached = self._read_cached(url_key)
+        if cached is not None:
+            return cached
+        if self._recently_failed(url_key):
+            return None
+        
+        try:
+            content = self._download(url)
+        except Exception as e:
+            logger.warning(f"Failed to fetch image {url}: {str(e)}")
+            self._mark_failed(url_key)
+            return None
+        
+        try:
+            self._write_cached(url_key, content)
+        except OSError as e:
+            logger.warning(f"Failed to cache image: {str(e)}")
+        return content
+    
+    def _download(self, url: str) -> bytes:
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > self.max_image_bytes:
+                    raise ValueError(f"Image larger than {self.max_image_bytes} bytes")
+                chunks.append(chunk)
+            return b''.join(chunks)
+    
+    def _path(self, kind: str, key: str) -> Path:
+        return self.cache_dir / kind / key[:2] / key
+    
+    def _read_cached(self, url_key: str) -> Optional[bytes]:
+        try:
+            blob_key = self._path('urls', url_key).read_text().strip()
+            blob_path = self._path('blobs', blob_key)
+            content = blob_path.read_bytes()
+            os.utime(blob_path)  # Keep recently used images from eviction
+            return content
+        except (OSError, ValueError):
+            return None
+    
+    def _write_cached(self, url_key: str, content: bytes) -> None:
+        blob_key = hashlib.sha256(content).hexdigest()
+        blob_path = self._path('blobs', blob_key)
+        written = 0
+        if not blob_path.exists():
+            self._atomic_write(blob_path, content)
+            written += len(content)
+        self._atomic_write(self._path('urls', url_key), blob_key.encode('ascii'))
+        self.schedule.record_write(written, self._evict)
+    
+    def _recently_failed(self, url_key: str) -> bool:
+        try:
+            failed_at = self._path('failed', url_key).stat().st_mtime
+        except OSError:
+            return False
+        return time.time() - failed_at < self.negative_ttl
+    
+    def _mark_failed(self, url_key: str) -> None:
+        try:
+            self._atomic_write(self._path('failed', url_key), b'')
+        except OSError:
+            pass
+    
+    def _atomic_write(self, path: Path, content: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    def _entries(self, kind: str) -> Iterable[Path]:
+        """Cache files of one kind, skipping temp files of writes in progress"""
+        for path in (self.cache_dir / kind).glob('*/*'):
+            if len(path.name) == 64:
+                yield path
+    
+    def _evict(self) -> int:
+        """Trim the cache once its blobs exceed max_bytes; returns the blob bytes left
+        
+        Deletes least recently used blobs, then URL index entries whose
+        blob is gone and failure markers older than negative_ttl. Walks the
+        whole cache, so it only runs when the eviction schedule says so.
+        """
+        blobs = []
+        for blob_path in self._entries('blobs'):
+            try:
+                stat = blob_path.stat()
+            except OSError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, blob_path))
+        
+        total = sum(size for _, size, _ in blobs)
+        if total > self.max_bytes:
+            for _, size, blob_path in sorted(blobs):
+                if total <= self.max_bytes * EVICT_LOW_WATER:
+                    break
+                try:
+                    blob_path.unlink()
+                except OSError:
+                    continue
+                total -= size
+        
+        for url_path in self._entries('urls'):
+            try:
+                if not self._path('blobs', url_path.read_text().strip()).exists():
+                    url_path.unlink()
+            except (OSError, ValueError):
+                continue
+        
+        expired = time.time() - self.negative_ttl
+        for marker_path in self._entries('failed'):
+            try:
+                if marker_path.stat().st_mtime < expired:
+                    marker_path.unlink()
+            except OSError:
+                continue
+        return total
+
+image_fetcher = ImageFetcher(
+    cache_dir=settings.EXPORT_IMAGE_CACHE_DIR,
+    max_bytes=settings.EXPORT_IMAGE_CACHE_MAX_BYTES,
+    timeout=settings.EXPORT_IMAGE_TIMEOUT,
+    max_workers=settings.EXPORT_IMAGE_MAX_WORKERS,
+    negative_ttl=settings.EXPORT_IMAGE_NEGATIVE_TTL,
+    max_image_bytes=settings.EXPORT_IMAGE_MAX_BYTES,
+    evict_interval=settings.EXPORT_IMAGE_CACHE_EVICT_INTERVAL
+)
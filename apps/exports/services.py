@@ -1,34 +1,50 @@
-from pptx import Presentation as PPTXPresentation
-from pptx.util import Inches, Pt
-from pptx.dml.color import RGBColor
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
 from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.functional import SimpleLazyObject
+from apps.core.timing import timed
+from .images import image_fetcher
 import io
-import requests
+import json
 import logging
+import tempfile
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Layout used for every content slide unless a template names another one
+DEFAULT_CONTENT_LAYOUT = 'Title and Content'
+
+def new_export_file():
+    """Output file kept in memory up to EXPORT_SPOOL_MAX_BYTES, then spilled to disk"""
+    return tempfile.SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_BYTES)
+
 class PPTXExportService:
     """Service for exporting presentations to PPTX format"""
     
-    def create_pptx(self, presentation_obj):
+    def __init__(self):
+        # Base templates parsed once per process (None = python-pptx default)
+        self._prototypes = {}
+        self._prototype_lock = threading.Lock()
+    
+    def create_pptx(self, presentation_obj, template_obj=None):
         """Create PPTX file from presentation object"""
+        # python-pptx and reportlab are imported on first export, not at startup
+        from pptx.util import Inches
+        
         try:
-            # Create presentation
-            prs = PPTXPresentation()
+            # Clone the preloaded 16:9 base template
+            prs, layout_index = self._new_presentation(template_obj)
+            slide_layout = prs.slide_layouts[layout_index]
             
-            # Set slide size (16:9)
-            prs.slide_width = Inches(13.33)
-            prs.slide_height = Inches(7.5)
+            # Download all slide images up front, in parallel
+            # (Slide.Meta.ordering sorts by slide_number and keeps prefetched slides usable)
+            slides = list(presentation_obj.slides.all())
+            with timed('image_fetch'):
+                images = image_fetcher.prefetch(slide_obj.image_url for slide_obj in slides)
             
             # Process each slide
-            for slide_obj in presentation_obj.slides.all().order_by('slide_number'):
-                slide_layout = prs.slide_layouts[1]  # Title and Content layout
+            for slide_obj in slides:
                 slide = prs.slides.add_slide(slide_layout)
                 
                 # Add title
@@ -41,23 +57,21 @@ class PPTXExportService:
                 text_frame.text = slide_obj.content
                 
                 # Add image if available
-                if slide_obj.image_url:
+                image_content = images.get(slide_obj.image_url) if slide_obj.image_url else None
+                if image_content:
                     try:
-                        # Download image
-                        response = requests.get(slide_obj.image_url, timeout=10)
-                        if response.status_code == 200:
-                            image_stream = io.BytesIO(response.content)
-                            
-                            # Add image to slide
-                            left = Inches(8)
-                            top = Inches(2)
-                            width = Inches(4)
-                            slide.shapes.add_picture(image_stream, left, top, width=width)
+                        image_stream = io.BytesIO(image_content)
+                        
+                        # Add image to slide
+                        left = Inches(8)
+                        top = Inches(2)
+                        width = Inches(4)
+                        slide.shapes.add_picture(image_stream, left, top, width=width)
                     except Exception as img_error:
                         logger.warning(f"Failed to add image to slide: {str(img_error)}")
             
-            # Save to BytesIO
-            pptx_stream = io.BytesIO()
+            # Save to a spooled file (disk-backed for large decks)
+            pptx_stream = new_export_file()
             prs.save(pptx_stream)
             pptx_stream.seek(0)
             
@@ -66,15 +80,72 @@ class PPTXExportService:
         except Exception as e:
             logger.error(f"PPTX creation error: {str(e)}")
             raise Exception(f"Failed to create PPTX: {str(e)}")
+    
+    def _new_presentation(self, template_obj=None):
+        """Return a fresh presentation cloned from the preloaded base template"""
+        from pptx import Presentation as PPTXPresentation
+        
+        key = None
+        if template_obj is not None:
+            # Re-parse when the template definition changes
+            key = (template_obj.id, json.dumps(template_obj.template_data, sort_keys=True, default=str))
+        if key not in self._prototypes:
+            with self._prototype_lock:
+                if key not in self._prototypes:
+                    self._prototypes[key] = self._load_prototype(template_obj)
+        prototype, layout_index = self._prototypes[key]
+        return PPTXPresentation(io.BytesIO(prototype)), layout_index
+    
+    def _load_prototype(self, template_obj=None):
+        """Prepare a base template once: 16:9, trimmed to the layouts exports use
+        
+        Returns the serialized package and the index of its content layout.
+        """
+        from pptx import Presentation as PPTXPresentation
+        from pptx.util import Inches
+        
+        template_data = template_obj.template_data if template_obj is not None else {}
+        pptx_file = template_data.get('pptx_file')
+        if pptx_file:
+            with default_storage.open(pptx_file, 'rb') as template_file:
+                prs = PPTXPresentation(io.BytesIO(template_file.read()))
+        else:
+            prs = PPTXPresentation()
+        
+        # Set slide size (16:9)
+        prs.slide_width = Inches(13.33)
+        prs.slide_height = Inches(7.5)
+        
+        layout_name = template_data.get('content_layout', DEFAULT_CONTENT_LAYOUT)
+        content_layout = next(
+            (layout for layout in prs.slide_layouts if layout.name == layout_name),
+            prs.slide_layouts[1]  # Title and Content in the default template
+        )
+        
+        if settings.EXPORT_PPTX_TRIM_LAYOUTS:
+            # Unused layouts are re-parsed and re-zipped on every export
+            for layout in list(prs.slide_layouts):
+                if layout != content_layout and not layout.used_by_slides:
+                    prs.slide_layouts.remove(layout)
+        
+        prototype = io.BytesIO()
+        prs.save(prototype)
+        layout_index = prs.slide_layouts.index(content_layout)
+        return prototype.getvalue(), layout_index
 
 class PDFExportService:
     """Service for exporting presentations to PDF format"""
     
     def create_pdf(self, presentation_obj):
         """Create PDF file from presentation object"""
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        
         try:
-            # Create PDF buffer
-            pdf_buffer = io.BytesIO()
+            # Create PDF buffer (disk-backed for large decks)
+            pdf_buffer = new_export_file()
             
             # Create document
             doc = SimpleDocTemplate(
@@ -123,8 +194,14 @@ class PDFExportService:
                 story.append(Paragraph(presentation_obj.description, styles['Normal']))
                 story.append(Spacer(1, 20))
             
+            # Download all slide images up front, in parallel
+            # (Slide.Meta.ordering sorts by slide_number and keeps prefetched slides usable)
+            slides = list(presentation_obj.slides.all())
+            with timed('image_fetch'):
+                images = image_fetcher.prefetch(slide_obj.image_url for slide_obj in slides)
+            
             # Add slides
-            for slide_obj in presentation_obj.slides.all().order_by('slide_number'):
+            for slide_obj in slides:
                 # Add slide title
                 story.append(Paragraph(f"Slide {slide_obj.slide_number}: {slide_obj.title}", slide_title_style))
                 
@@ -132,12 +209,11 @@ class PDFExportService:
                 story.append(Paragraph(slide_obj.content, content_style))
                 
                 # Add image if available
-                if slide_obj.image_url:
+                image_content = images.get(slide_obj.image_url) if slide_obj.image_url else None
+                if image_content:
                     try:
-                        response = requests.get(slide_obj.image_url, timeout=10)
-                        if response.status_code == 200:
-                            image_stream = io.BytesIO(response.content)
-                            story.append(Image(image_stream, width=4*inch, height=3*inch))
+                        image_stream = io.BytesIO(image_content)
+                        story.append(Image(image_stream, width=4*inch, height=3*inch))
                     except Exception as img_error:
                         logger.warning(f"Failed to add image to PDF: {str(img_error)}")
                 
@@ -153,6 +229,6 @@ class PDFExportService:
             logger.error(f"PDF creation error: {str(e)}")
             raise Exception(f"Failed to create PDF: {str(e)}")
 
-# Initialize services
-pptx_service = PPTXExportService()
-pdf_service = PDFExportService()
+# Initialize services on first use
+pptx_service = SimpleLazyObject(PPTXExportService)
+pdf_service = SimpleLazyObject(PDFExportService)
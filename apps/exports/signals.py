@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.presentations.models import Presentation, Slide
+from .cache import render_cache
+
+@receiver([post_save, post_delete], sender=Presentation)
+def invalidate_presentation_renders(sender, instance, **kwargs):
+    """Drop cached exports when a presentation changes or is deleted"""
+    # Status-only saves (generation progress) do not affect the rendered file
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'status', 'updated_at'}:
+        return
+    render_cache.invalidate(instance.id)
+
+@receiver([post_save, post_delete], sender=Slide)
+def invalidate_slide_renders(sender, instance, **kwargs):
+    """Drop cached exports when one of the deck's slides is edited or removed"""
+    render_cache.invalidate(instance.presentation_id)
@@ -4,5 +4,7 @@ from . import views
 urlpatterns = [
     path('pptx/', views.export_pptx, name='export_pptx'),
     path('pdf/', views.export_pdf, name='export_pdf'),
+    path('bulk/', views.export_bulk, name='export_bulk'),
     path('formats/', views.export_formats, name='export_formats'),
+    path('status/', views.export_status, name='export_status'),
 ]
@@ -2,14 +2,84 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from apps.presentations.models import Presentation
-from .services import pptx_service, pdf_service
+from django.utils.text import slugify
+from apps.presentations.models import Presentation, PresentationTemplate
+from .archive import stream_zip
+from .cache import render_cache
+from .executor import render_executor
+import io
+import json
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+EXPORT_RENDERERS = {
+    'pptx': lambda presentation: render_executor.render('pptx', presentation),
+    'pdf': lambda presentation: render_executor.render('pdf', presentation),
+}
+
+def _rendered_file(presentation, extension, render, variant=''):
+    """Return (file, cached) for a deck, rendering and caching it on a miss"""
+    fingerprint = render_cache.fingerprint(presentation, variant)
+    cached_file = render_cache.open(presentation.id, fingerprint, extension)
+    if cached_file is not None:
+        return cached_file, True
+    
+    stream = render(presentation)
+    render_cache.save(presentation.id, fingerprint, extension, stream)
+    return stream, False
+
+def _export_response(presentation, extension, render, content_type, variant=''):
+    """Serve a cached render of the deck, rendering and caching it on a miss
+    
+    The file is streamed in chunks (FileResponse sets Content-Length and
+    closes it), so the rendered output is never copied into the response.
+    """
+    file_obj, _ = _rendered_file(presentation, extension, render, variant)
+    return FileResponse(file_obj, content_type=content_type)
+
+def _archive_name(presentation, extension):
+    """Unique, filesystem-safe file name for a deck inside an archive"""
+    return f"{slugify(presentation.title)[:80] or 'presentation'}-{str(presentation.id)[:8]}.{extension}"
+
+def _bulk_export_entries(user, presentation_ids, formats):
+    """Render decks batch by batch and yield (name, file) archive entries"""
+    batch_size = settings.EXPORT_BULK_BATCH_SIZE
+    manifest = {'exported': [], 'failed': []}
+    
+    for start in range(0, len(presentation_ids), batch_size):
+        batch_ids = presentation_ids[start:start + batch_size]
+        batch = {
+            str(presentation.id): presentation
+            for presentation in Presentation.objects
+            .filter(user=user, id__in=batch_ids)
+            .prefetch_related('slides')
+        }
+        for presentation_id in batch_ids:
+            presentation = batch.get(presentation_id)
+            if presentation is None:
+                manifest['failed'].append({'presentation_id': presentation_id, 'error': 'Presentation not found'})
+                continue
+            for extension in formats:
+                name = _archive_name(presentation, extension)
+                if not presentation.slides.all():
+                    manifest['failed'].append({'file': name, 'error': 'Presentation has no slides to export'})
+                    continue
+                try:
+                    file_obj, _ = _rendered_file(presentation, extension, EXPORT_RENDERERS[extension])
+                except Exception as e:
+                    logger.error(f"Bulk export error for {presentation.id}: {str(e)}")
+                    manifest['failed'].append({'file': name, 'error': 'Failed to export presentation'})
+                    continue
+                manifest['exported'].append(name)
+                yield name, file_obj
+    
+    yield 'manifest.json', io.BytesIO(json.dumps(manifest, indent=2).encode('utf-8'))
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def export_pptx(request):
@@ -34,18 +104,27 @@ def export_pptx(request):
                 'error': 'Presentation has no slides to export'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Generate PPTX
-        pptx_stream = pptx_service.create_pptx(presentation)
+        # Optional base template
+        template = None
+        template_id = request.data.get('template_id')
+        if template_id:
+            template = get_object_or_404(PresentationTemplate, id=template_id)
         
-        # Create response
-        response = HttpResponse(
-            pptx_stream.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.presentationml.presentation'
+        # Generate PPTX (or reuse the cached render)
+        response = _export_response(
+            presentation,
+            'pptx',
+            lambda deck: render_executor.render('pptx', deck, template),
+            'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+            variant=json.dumps([str(template.id), template.template_data], sort_keys=True, default=str) if template else ''
         )
         response['Content-Disposition'] = f'attachment; filename="{presentation.title}.pptx"'
         
         return response
         
+    except Http404:
+        # Unknown presentation or template
+        raise
     except Exception as e:
         logger.error(f"PPTX export error: {str(e)}")
         return Response({
@@ -77,18 +156,20 @@ def export_pdf(request):
                 'error': 'Presentation has no slides to export'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Generate PDF
-        pdf_stream = pdf_service.create_pdf(presentation)
-        
-        # Create response
-        response = HttpResponse(
-            pdf_stream.getvalue(),
-            content_type='application/pdf'
+        # Generate PDF (or reuse the cached render)
+        response = _export_response(
+            presentation,
+            'pdf',
+            EXPORT_RENDERERS['pdf'],
+            'application/pdf'
         )
         response['Content-Disposition'] = f'attachment; filename="{presentation.title}.pdf"'
         
         return response
         
+    except Http404:
+        # Unknown presentation or template
+        raise
     except Exception as e:
         logger.error(f"PDF export error: {str(e)}")
         return Response({
@@ -96,6 +177,51 @@ def export_pdf(request):
             'details': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def export_bulk(request):
+    """Export several presentations as one streamed ZIP archive"""
+    presentation_ids = request.data.get('presentation_ids')
+    formats = request.data.get('formats', ['pptx'])
+    
+    if not isinstance(presentation_ids, list) or not presentation_ids:
+        return Response({
+            'error': 'presentation_ids must be a non-empty list'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if len(presentation_ids) > settings.EXPORT_BULK_MAX_PRESENTATIONS:
+        return Response({
+            'error': f'At most {settings.EXPORT_BULK_MAX_PRESENTATIONS} presentations can be exported at once'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not isinstance(formats, list) or not formats or not set(formats) <= set(EXPORT_RENDERERS):
+        return Response({
+            'error': f'formats must be a list containing {", ".join(EXPORT_RENDERERS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        presentation_ids = list(dict.fromkeys(str(uuid.UUID(str(value))) for value in presentation_ids))
+    except ValueError:
+        return Response({
+            'error': 'presentation_ids must be valid presentation ids'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    response = StreamingHttpResponse(
+        stream_zip(_bulk_export_entries(request.user, presentation_ids, list(dict.fromkeys(formats)))),
+        content_type='application/zip'
+    )
+    response['Content-Disposition'] = 'attachment; filename="presentations.zip"'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_status(request):
+    """Get render pool usage (in-flight renders and queue depth)"""
+    return Response({
+        'renderer': render_executor.stats(),
+        'render_cache_enabled': render_cache.enabled,
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def export_formats(request):
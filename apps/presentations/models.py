@@ -28,6 +28,10 @@ class Presentation(models.Model):
     class Meta:
         db_table = 'presentations'
         ordering = ['-created_at']
+        indexes = [
+            # Serves per-user listing and keyset pagination on (created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='presentation_user_created_idx'),
+        ]
         verbose_name = 'Presentation'
         verbose_name_plural = 'Presentations'
     
@@ -38,7 +38,9 @@ class PresentationListSerializer(serializers.ModelSerializer):
                  'slide_count', 'slide_count_actual', 'created_at', 'updated_at')
     
     def get_slide_count_actual(self, obj):
-        return obj.slides.count()
+        # Annotated by PresentationViewSet.get_queryset; count only as a fallback
+        annotated = getattr(obj, 'slide_count_actual', None)
+        return annotated if annotated is not None else obj.slides.count()
 
 class PresentationTemplateSerializer(serializers.ModelSerializer):
     """Presentation template serializer"""
@@ -0,0 +1,140 @@
+from django.db import transaction
+from django.utils import timezone
+from typing import Dict, List, Any, Iterable, Optional
+from .models import Presentation, Slide
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Slide fields that may be changed through deck-level updates
+SLIDE_UPDATE_FIELDS = ('title', 'content', 'image_url', 'image_prompt', 'background_color', 'text_color')
+
+class PresentationPersistenceService:
+    """Writes whole decks in a constant number of queries inside one transaction"""
+    
+    def build_slide(self, presentation: Presentation, slide_data: Dict[str, Any],
+                    default_number: int = 1) -> Slide:
+        """Build an unsaved Slide from generated slide data"""
+        return Slide(
+            presentation=presentation,
+            title=slide_data.get('title', ''),
+            content=slide_data.get('content', ''),
+            image_url=slide_data.get('image_url'),
+            image_prompt=slide_data.get('image_prompt', ''),
+            slide_number=slide_data.get('slide_number', default_number)
+        )
+    
+    def save_deck(self, presentation: Presentation, slides_data: Iterable[Dict[str, Any]],
+                  update_fields: Optional[List[str]] = None) -> List[Slide]:
+        """Save presentation fields and replace its slides atomically
+        
+        Issues one UPDATE for the presentation, one DELETE for any previous
+        slides and one batched INSERT for the new ones.
+        """
+        slides = [
+            self.build_slide(presentation, slide_data, default_number=index)
+            for index, slide_data in enumerate(slides_data, start=1)
+        ]
+        
+        with transaction.atomic():
+            if update_fields is None:
+                presentation.save()
+            else:
+                presentation.save(update_fields=list(update_fields) + ['updated_at'])
+            Slide.objects.filter(presentation=presentation).delete()
+            Slide.objects.bulk_create(slides)
+        
+        return slides
+    
+    def duplicate(self, original: Presentation, user) -> Presentation:
+        """Copy a presentation and all of its slides for a user"""
+        with transaction.atomic():
+            new_presentation = Presentation.objects.create(
+                user=user,
+                title=f"{original.title} (Copy)",
+                description=original.description,
+                topic=original.topic,
+                slide_count=original.slide_count
+            )
+            
+            Slide.objects.bulk_create([
+                Slide(
+                    presentation=new_presentation,
+                    title=slide.title,
+                    content=slide.content,
+                    image_url=slide.image_url,
+                    image_prompt=slide.image_prompt,
+                    slide_number=slide.slide_number,
+                    background_color=slide.background_color,
+                    text_color=slide.text_color
+                )
+                for slide in original.slides.all()
+            ])
+        
+        return new_presentation
+    
+    def diff_slide_updates(self, slides: Iterable[Slide], proposed: Iterable[Dict[str, Any]],
+                           fields: Iterable[str] = ('title', 'content', 'image_prompt')) -> Dict[int, Dict[str, Any]]:
+        """Keep only the proposed slide field values that differ from the current slides
+        
+        Proposed entries are matched by slide_number; slides not in `slides`
+        and non-string values are ignored.
+        """
+        current = {slide.slide_number: slide for slide in slides}
+        updates = {}
+        for proposed_slide in proposed:
+            slide = current.get(proposed_slide.get('slide_number'))
+            if slide is None:
+                continue
+            changes = {
+                field: proposed_slide[field]
+                for field in fields
+                if isinstance(proposed_slide.get(field), str)
+                and proposed_slide[field] != getattr(slide, field)
+            }
+            if changes:
+                updates[slide.slide_number] = changes
+        return updates
+    
+    def update_slides(self, presentation: Presentation, slide_updates: Dict[int, Dict[str, Any]],
+                      presentation_updates: Optional[Dict[str, Any]] = None) -> List[Slide]:
+        """Apply field updates keyed by slide_number in one bulk UPDATE
+        
+        Unknown slide numbers and fields outside SLIDE_UPDATE_FIELDS are
+        ignored. Returns the slides that were changed.
+        """
+        with transaction.atomic():
+            if presentation_updates:
+                for field, value in presentation_updates.items():
+                    setattr(presentation, field, value)
+                presentation.save(update_fields=list(presentation_updates) + ['updated_at'])
+            
+            if not slide_updates:
+                return []
+            
+            now = timezone.now()
+            changed_slides = []
+            changed_fields = set()
+            slides = Slide.objects.filter(
+                presentation=presentation,
+                slide_number__in=list(slide_updates)
+            )
+            for slide in slides:
+                fields = [
+                    field for field in slide_updates[slide.slide_number]
+                    if field in SLIDE_UPDATE_FIELDS
+                ]
+                if not fields:
+                    continue
+                for field in fields:
+                    setattr(slide, field, slide_updates[slide.slide_number][field])
+                changed_fields.update(fields)
+                slide.updated_at = now
+                changed_slides.append(slide)
+
+            if changed_slides:
+                Slide.objects.bulk_update(changed_slides, sorted(changed_fields) + ['updated_at'])
+        
+        return changed_slides
+
+persistence_service = PresentationPersistenceService()
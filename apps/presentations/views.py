@@ -2,6 +2,7 @@ from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from .models import Presentation, Slide, PresentationTemplate
 from .serializers import (
@@ -11,13 +12,33 @@ from .serializers import (
     SlideSerializer,
     PresentationTemplateSerializer
 )
+from .pagination import PresentationCursorPagination
+from .services import persistence_service
 
 class PresentationViewSet(viewsets.ModelViewSet):
     """Presentation CRUD operations"""
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Presentation.objects.filter(user=self.request.user)
+        queryset = Presentation.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            # Count slides in the list query instead of once per row
+            # (Meta.ordering is not applied to aggregate queries)
+            queryset = queryset.annotate(
+                slide_count_actual=Count('slides')
+            ).order_by('-created_at', '-id')
+        return queryset
+    
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client asks for cursors"""
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request else {}
+            if 'cursor' in params or params.get('pagination') == 'cursor':
+                self._paginator = PresentationCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -42,27 +63,7 @@ class PresentationViewSet(viewsets.ModelViewSet):
         """Duplicate a presentation"""
         original = self.get_object()
         
-        # Create new presentation
-        new_presentation = Presentation.objects.create(
-            user=request.user,
-            title=f"{original.title} (Copy)",
-            description=original.description,
-            topic=original.topic,
-            slide_count=original.slide_count
-        )
-        
-        # Duplicate slides
-        for slide in original.slides.all():
-            Slide.objects.create(
-                presentation=new_presentation,
-                title=slide.title,
-                content=slide.content,
-                image_url=slide.image_url,
-                image_prompt=slide.image_prompt,
-                slide_number=slide.slide_number,
-                background_color=slide.background_color,
-                text_color=slide.text_color
-            )
+        new_presentation = persistence_service.duplicate(original, request.user)
         
         serializer = PresentationSerializer(new_presentation)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,95 @@
+"""
+Python memory per export: rendering into a BytesIO and copying it into an
+HttpResponse (previous behaviour) vs rendering into a spooled temporary file
+streamed through FileResponse.
+
+Usage: python benchmarks/export_memory.py [--slides 10] [--image-kib 512]
+"""
+
+import argparse
+import gc
+import io
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'slidecraft_backend.settings')
+
+import django
+
+django.setup()
+
+from django.http import FileResponse, HttpResponse
+from PIL import Image
+from apps.exports import services
+from apps.exports.services import pdf_service, pptx_service
+from benchmarks.pptx_template import BenchPresentation
+
+def make_image(kib):
+    """Noise JPEG of roughly `kib` KiB (noise does not compress)"""
+    side = int((kib * 1024 / 3) ** 0.5 * 1.6)
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=95)
+    return output.getvalue()
+
+def legacy_response(render, presentation, content_type):
+    with mock.patch.object(services, 'new_export_file', io.BytesIO):
+        stream = render(presentation)
+    return HttpResponse(stream.getvalue(), content_type=content_type)
+
+def streamed_response(render, presentation, content_type):
+    return FileResponse(render(presentation), content_type=content_type)
+
+def measure(build_response, render, presentation, content_type):
+    """Peak traced memory while rendering, and memory held while the body is sent
+    
+    The held figure is what each in-flight download keeps alive until a
+    (possibly slow) client has read the last byte.
+    """
+    gc.collect()
+    tracemalloc.start()
+    response = build_response(render, presentation, content_type)
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    sent = sum(len(chunk) for chunk in response)
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, held, sent, response.get('Content-Length')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--slides', type=int, default=10)
+    parser.add_argument('--image-kib', type=int, default=512)
+    args = parser.parse_args()
+    
+    presentation = BenchPresentation(args.slides)
+    images = {}
+    for slide in presentation.slides:
+        slide.image_url = f"https://images.example.com/{slide.slide_number}.jpg"
+        images[slide.image_url] = make_image(args.image_kib)
+    
+    renderers = {
+        'pptx': (pptx_service.create_pptx, 'application/vnd.openxmlformats-officedocument.presentationml.presentation'),
+        'pdf': (pdf_service.create_pdf, 'application/pdf'),
+    }
+    
+    print(f"{args.slides}-slide deck, {len(next(iter(images.values()))) // 1024} KiB image per slide, "
+          f"spool threshold {services.settings.EXPORT_SPOOL_MAX_BYTES // 1024} KiB")
+    with mock.patch.object(services.image_fetcher, 'prefetch', return_value=images):
+        for extension, (render, content_type) in renderers.items():
+            # Warm up (prototype, fonts)
+            render(presentation).close()
+            for label, build_response in (('BytesIO + HttpResponse', legacy_response),
+                                          ('spooled FileResponse', streamed_response)):
+                peak, held, sent, content_length = measure(build_response, render, presentation, content_type)
+                print(f"  {extension:4} {label:23} peak {peak / 1024 / 1024:6.2f} MiB   "
+                      f"held while sending {held / 1024 / 1024:6.2f} MiB   "
+                      f"sent {sent / 1024 / 1024:5.2f} MiB   Content-Length {content_length}")
+
+if __name__ == '__main__':
+    main()
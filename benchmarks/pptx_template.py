@@ -0,0 +1,86 @@
+"""
+Per-export PPTX latency: parsing the default template on every export
+(previous behaviour) vs cloning the preloaded 16:9 prototype.
+
+Usage: python benchmarks/pptx_template.py [--runs 50] [--slides 10]
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'slidecraft_backend.settings')
+
+import django
+
+django.setup()
+
+from pptx import Presentation as PPTXPresentation
+from pptx.util import Inches
+from apps.exports.services import PPTXExportService
+
+class BenchSlide:
+    def __init__(self, number):
+        self.slide_number = number
+        self.title = f"Key point {number}"
+        self.content = "• First key point\n• Second key point\n• Third key point"
+        self.image_url = None
+
+class BenchSlides(list):
+    def all(self):
+        return self
+    
+    def order_by(self, *fields):
+        return self
+
+class BenchPresentation:
+    def __init__(self, slide_count):
+        self.title = "Benchmark deck"
+        self.description = "Synthetic deck used by the export benchmarks"
+        self.slides = BenchSlides(BenchSlide(number) for number in range(1, slide_count + 1))
+
+class LegacyPPTXExportService(PPTXExportService):
+    """Parses and resizes the default template for every export"""
+    
+    def _new_presentation(self, template_obj=None):
+        prs = PPTXPresentation()
+        prs.slide_width = Inches(13.33)
+        prs.slide_height = Inches(7.5)
+        return prs, 1
+
+def measure(service, presentation, runs):
+    # Warm up (and load the prototype)
+    with service.create_pptx(presentation) as output:
+        size = len(output.read())
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        service.create_pptx(presentation).close()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--slides', type=int, default=10)
+    args = parser.parse_args()
+    
+    presentation = BenchPresentation(args.slides)
+    results = {
+        'parse per export': measure(LegacyPPTXExportService(), presentation, args.runs),
+        'cloned prototype': measure(PPTXExportService(), presentation, args.runs),
+    }
+    
+    print(f"{args.slides}-slide deck, {args.runs} runs")
+    for label, (timings, size) in results.items():
+        print(f"  {label:18} median {statistics.median(timings):7.2f} ms   "
+              f"p95 {sorted(timings)[math.ceil(len(timings) * 0.95) - 1]:7.2f} ms   "
+              f"{size / 1024:6.1f} KiB")
+
+if __name__ == '__main__':
+    main()
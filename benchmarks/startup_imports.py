@@ -0,0 +1,81 @@
+"""
+Startup import cost: runs django.setup() and loads the URLconf (every view
+module) in a fresh interpreter under `python -X importtime`, then reports
+the total import time, the slowest top-level imports, and whether any SDK
+that should only load on first use was imported.
+
+Exits non-zero if a lazily loaded SDK is imported at startup or the total
+exceeds --budget-ms, so it can guard against regressions.
+
+Usage: python benchmarks/startup_imports.py [--runs 5] [--top 15] [--budget-ms 0]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Must not be imported until a code path actually needs them
+LAZY_MODULES = ('google.generativeai', 'pptx', 'reportlab')
+
+STARTUP_CODE = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+def run_once():
+    """Return {module: (self_us, cumulative_us)} for one interpreter start"""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'slidecraft_backend.settings')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.rstrip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=0, help='fail above this total (0 = no budget)')
+    args = parser.parse_args()
+    
+    runs = [run_once() for _ in range(args.runs)]
+    totals = [sum(self_us for self_us, _ in modules.values()) / 1000 for modules in runs]
+    total_ms = statistics.median(totals)
+    modules = runs[-1]
+    
+    print(f"django.setup() + URLconf, {args.runs} runs: median {total_ms:.1f} ms of imports "
+          f"({len(modules)} modules)")
+    
+    # Top-level entries (no leading indentation) with their cumulative time
+    top_level = sorted(
+        ((cumulative_us, name.strip()) for name, (_, cumulative_us) in modules.items() if not name.startswith('  ')),
+        reverse=True
+    )
+    for cumulative_us, name in top_level[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    
+    imported = {name.strip() for name in modules}
+    eager = [module for module in LAZY_MODULES if module in imported]
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup but should load lazily: {', '.join(eager)}")
+        failed = True
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.1f} ms exceeds the {args.budget_ms:.1f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,6 @@
 # This file makes Python treat the directory as a package
+
+# Load the Celery app when Django starts so shared_task uses it
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -0,0 +1,16 @@
+"""
+Celery application for SlideCraft AI Backend
+"""
+
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'slidecraft_backend.settings')
+
+app = Celery('slidecraft_backend')
+
+# Read CELERY_* settings from Django settings
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Discover tasks.py modules in installed apps
+app.autodiscover_tasks()
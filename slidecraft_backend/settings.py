@@ -83,7 +83,10 @@ LOCAL_APPS = [
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
+AUTH_USER_MODEL = 'authentication.User'
+
 MIDDLEWARE = [
+    'apps.core.middleware.ServerTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -163,6 +166,22 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# File storages (Django 4.2 STORAGES); export_cache holds rendered PPTX/PDF files
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'export_cache': {
+        'BACKEND': env('EXPORT_CACHE_STORAGE', default='django.core.files.storage.FileSystemStorage'),
+        'OPTIONS': {
+            'location': env('EXPORT_CACHE_DIR', default=str(MEDIA_ROOT / 'export_cache')),
+        },
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -240,6 +259,186 @@ GEMINI_API_KEY = env('GEMINI_API_KEY', default='')
 GEMINI_MODEL = env('GEMINI_MODEL', default='gemini-1.5-flash')
 GEMINI_MAX_TOKENS = parse_int_with_commas(env('GEMINI_MAX_TOKENS', default='8192'), 8192)
 GEMINI_TEMPERATURE = float(env('GEMINI_TEMPERATURE', default='0.7'))
+GEMINI_RATE_LIMIT_RPM = parse_int_with_commas(env('GEMINI_RATE_LIMIT_RPM', default='15'), 15)
+# Token bucket shared by all workers: redis (production) or local (per process)
+GEMINI_RATE_LIMIT_BACKEND = env('GEMINI_RATE_LIMIT_BACKEND', default='local')
+# Longest a background call waits for quota before giving up
+GEMINI_RATE_LIMIT_MAX_WAIT = float(env('GEMINI_RATE_LIMIT_MAX_WAIT', default='30'))
+# Max auxiliary Gemini calls in flight per deck (never more than the per-minute quota)
+GEMINI_MAX_CONCURRENCY = min(
+    parse_int_with_commas(env('GEMINI_MAX_CONCURRENCY', default='4'), 4),
+    GEMINI_RATE_LIMIT_RPM
+)
+GEMINI_CALL_TIMEOUT = float(env('GEMINI_CALL_TIMEOUT', default='20'))
+# Backend pool: extra API keys (comma separated, each with its own quota) and failover
+# models used when every key of the preferred model is out of quota, as model or model:rpm
+GEMINI_API_KEYS = [key.strip() for key in env('GEMINI_API_KEYS', default='').split(',') if key.strip()]
+GEMINI_FALLBACK_MODELS = [model.strip() for model in env('GEMINI_FALLBACK_MODELS', default='').split(',') if model.strip()]
+# Seconds a backend rests after a quota error or repeated failures
+GEMINI_BACKEND_COOLDOWN = float(env('GEMINI_BACKEND_COOLDOWN', default='30'))
+# Circuit breaker per backend: opens when GEMINI_BREAKER_FAILURE_RATIO of the last
+# GEMINI_BREAKER_WINDOW calls (at least GEMINI_BREAKER_MIN_CALLS) failed or took longer
+# than GEMINI_BREAKER_SLOW_CALL seconds; fallbacks are served until a probe succeeds
+GEMINI_BREAKER_ENABLED = env.bool('GEMINI_BREAKER_ENABLED', default=True)
+GEMINI_BREAKER_WINDOW = parse_int_with_commas(env('GEMINI_BREAKER_WINDOW', default='20'), 20)
+GEMINI_BREAKER_MIN_CALLS = parse_int_with_commas(env('GEMINI_BREAKER_MIN_CALLS', default='5'), 5)
+GEMINI_BREAKER_FAILURE_RATIO = float(env('GEMINI_BREAKER_FAILURE_RATIO', default='0.5'))
+GEMINI_BREAKER_SLOW_CALL = float(env('GEMINI_BREAKER_SLOW_CALL', default='30'))
+GEMINI_BREAKER_OPEN_SECONDS = float(env('GEMINI_BREAKER_OPEN_SECONDS', default='30'))
+# Hedged requests: a call still running at the p95 latency of its operation gets a
+# duplicate (when quota is free right away) and the first answer wins. Costs quota.
+GEMINI_HEDGE_ENABLED = env.bool('GEMINI_HEDGE_ENABLED', default=False)
+GEMINI_HEDGE_QUANTILE = float(env('GEMINI_HEDGE_QUANTILE', default='0.95'))
+
+# Text generation backend: gemini, or local (deterministic offline decks for load tests;
+# raise GEMINI_RATE_LIMIT_RPM too when testing at high concurrency)
+LLM_PROVIDER = env('LLM_PROVIDER', default='gemini')
+# Local provider: seconds per call, +/- jitter as a fraction, share of failed calls,
+# requests per minute before it answers with 429 (0 = unlimited) and RNG seed
+LLM_LOCAL_LATENCY = float(env('LLM_LOCAL_LATENCY', default='1.0'))
+LLM_LOCAL_LATENCY_JITTER = float(env('LLM_LOCAL_LATENCY_JITTER', default='0.25'))
+LLM_LOCAL_ERROR_RATE = float(env('LLM_LOCAL_ERROR_RATE', default='0'))
+LLM_LOCAL_RATE_LIMIT_RPM = parse_int_with_commas(env('LLM_LOCAL_RATE_LIMIT_RPM', default='0'), 0)
+LLM_LOCAL_SEED = parse_int_with_commas(env('LLM_LOCAL_SEED', default='0'), 0)
+
+# Redis Configuration
+REDIS_URL = env('REDIS_URL', default='redis://localhost:6379/0')
+
+# Celery Configuration (background generation jobs)
+CELERY_BROKER_URL = env('CELERY_BROKER_URL', default=REDIS_URL)
+CELERY_RESULT_BACKEND = env('CELERY_RESULT_BACKEND', default=REDIS_URL)
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_TRACK_STARTED = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_RESULT_EXPIRES = timedelta(days=1)
+CELERY_TASK_TIME_LIMIT = parse_int_with_commas(env('CELERY_TASK_TIME_LIMIT', default='300'), 300)
+# Run tasks inline when no worker is available (local development)
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=False)
+CELERY_TASK_EAGER_PROPAGATES = True
+
+# Generation Cache Configuration (reuse decks for repeated topics)
+# Backends: memory (per-process LRU), redis (shared), filesystem (shared on one host)
+GENERATION_CACHE_ENABLED = env.bool('GENERATION_CACHE_ENABLED', default=True)
+GENERATION_CACHE_BACKEND = env('GENERATION_CACHE_BACKEND', default='memory')
+GENERATION_CACHE_TTL = parse_int_with_commas(env('GENERATION_CACHE_TTL', default='86400'), 86400)
+GENERATION_CACHE_MAX_ENTRIES = parse_int_with_commas(env('GENERATION_CACHE_MAX_ENTRIES', default='1000'), 1000)
+GENERATION_CACHE_DIR = env('GENERATION_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'generations'))
+
+def get_generation_cache_config():
+    """Build the Django cache configuration for the generation cache"""
+    options = {'MAX_ENTRIES': GENERATION_CACHE_MAX_ENTRIES}
+    if GENERATION_CACHE_BACKEND == 'redis':
+        # Size is bounded by the Redis server's maxmemory/eviction policy
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': env('GENERATION_CACHE_REDIS_URL', default=REDIS_URL),
+            'KEY_PREFIX': 'slidecraft:generations',
+            'TIMEOUT': GENERATION_CACHE_TTL,
+        }
+    if GENERATION_CACHE_BACKEND == 'filesystem':
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': GENERATION_CACHE_DIR,
+            'TIMEOUT': GENERATION_CACHE_TTL,
+            'OPTIONS': options,
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'slidecraft-generations',
+        'TIMEOUT': GENERATION_CACHE_TTL,
+        'OPTIONS': options,
+    }
+
+def get_generation_stats_cache_config():
+    """Build the cache configuration for the generation cache hit/miss counters
+    
+    The counters live apart from the decks so MAX_ENTRIES culling of the
+    deck cache can never evict them.
+    """
+    if GENERATION_CACHE_BACKEND == 'redis':
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': env('GENERATION_CACHE_REDIS_URL', default=REDIS_URL),
+            'KEY_PREFIX': 'slidecraft:generation-stats',
+            'TIMEOUT': None,
+        }
+    if GENERATION_CACHE_BACKEND == 'filesystem':
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(GENERATION_CACHE_DIR, 'stats'),
+            'TIMEOUT': None,
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'slidecraft-generation-stats',
+        'TIMEOUT': None,
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'generations': get_generation_cache_config(),
+    'generation_stats': get_generation_stats_cache_config(),
+}
+
+# Single-flight: concurrent requests for the same deck share one Gemini call.
+# Backends: redis (across workers), local (per process) or off
+GENERATION_SINGLEFLIGHT_BACKEND = env('GENERATION_SINGLEFLIGHT_BACKEND', default='local')
+# Longest a follower waits for the leader before calling Gemini itself
+GENERATION_SINGLEFLIGHT_TIMEOUT = float(env('GENERATION_SINGLEFLIGHT_TIMEOUT', default='60'))
+# Redis lock lease (renewed while the leader works) and how long its result stays readable
+GENERATION_SINGLEFLIGHT_LEASE = float(env('GENERATION_SINGLEFLIGHT_LEASE', default='15'))
+GENERATION_SINGLEFLIGHT_RESULT_TTL = float(env('GENERATION_SINGLEFLIGHT_RESULT_TTL', default='30'))
+
+# Near-duplicate topic reuse: off, suggest (GET similar-topics offers a deck, the
+# client opts in with reuseDeckId) or auto (similar decks replace Gemini calls)
+TOPIC_REUSE_MODE = env('TOPIC_REUSE_MODE', default='suggest')
+# Minimum character-trigram Jaccard similarity between normalized topics
+TOPIC_REUSE_THRESHOLD = float(env('TOPIC_REUSE_THRESHOLD', default='0.5'))
+TOPIC_REUSE_MAX_AGE_DAYS = parse_int_with_commas(env('TOPIC_REUSE_MAX_AGE_DAYS', default='30'), 30)
+
+# Export Render Cache Configuration
+EXPORT_CACHE_ENABLED = env.bool('EXPORT_CACHE_ENABLED', default=True)
+EXPORT_CACHE_MAX_BYTES = parse_int_with_commas(env('EXPORT_CACHE_MAX_BYTES', default=str(512 * 1024 * 1024)), 512 * 1024 * 1024)
+# Seconds between full eviction scans while the cache looks under budget
+EXPORT_CACHE_EVICT_INTERVAL = float(env('EXPORT_CACHE_EVICT_INTERVAL', default='300'))
+
+# Rendered exports stay in memory up to this size, then spill to a temp file
+EXPORT_SPOOL_MAX_BYTES = parse_int_with_commas(env('EXPORT_SPOOL_MAX_BYTES', default=str(5 * 1024 * 1024)), 5 * 1024 * 1024)
+
+# Export rendering runs in this many worker processes per web process
+# (0 renders inline in the request thread)
+EXPORT_RENDER_WORKERS = parse_int_with_commas(env('EXPORT_RENDER_WORKERS', default='2'), 2)
+EXPORT_RENDER_TIMEOUT = float(env('EXPORT_RENDER_TIMEOUT', default='120'))
+EXPORT_RENDER_START_METHOD = env('EXPORT_RENDER_START_METHOD', default='spawn')
+
+# Bulk ZIP export limits (decks are loaded BATCH_SIZE at a time)
+EXPORT_BULK_MAX_PRESENTATIONS = parse_int_with_commas(env('EXPORT_BULK_MAX_PRESENTATIONS', default='100'), 100)
+EXPORT_BULK_BATCH_SIZE = parse_int_with_commas(env('EXPORT_BULK_BATCH_SIZE', default='10'), 10)
+
+# Drop slide layouts the exporter never uses from the base PPTX template
+EXPORT_PPTX_TRIM_LAYOUTS = env.bool('EXPORT_PPTX_TRIM_LAYOUTS', default=True)
+
+# Export Image Fetching Configuration
+EXPORT_IMAGE_CACHE_DIR = env('EXPORT_IMAGE_CACHE_DIR', default=str(MEDIA_ROOT / 'image_cache'))
+EXPORT_IMAGE_CACHE_MAX_BYTES = parse_int_with_commas(env('EXPORT_IMAGE_CACHE_MAX_BYTES', default=str(256 * 1024 * 1024)), 256 * 1024 * 1024)
+EXPORT_IMAGE_MAX_BYTES = parse_int_with_commas(env('EXPORT_IMAGE_MAX_BYTES', default=str(10 * 1024 * 1024)), 10 * 1024 * 1024)
+EXPORT_IMAGE_TIMEOUT = float(env('EXPORT_IMAGE_TIMEOUT', default='10'))
+EXPORT_IMAGE_MAX_WORKERS = parse_int_with_commas(env('EXPORT_IMAGE_MAX_WORKERS', default='8'), 8)
+# Seconds a URL that failed to download is skipped before retrying
+EXPORT_IMAGE_NEGATIVE_TTL = parse_int_with_commas(env('EXPORT_IMAGE_NEGATIVE_TTL', default='600'), 600)
+# Seconds between full eviction scans while the image cache looks under budget
+EXPORT_IMAGE_CACHE_EVICT_INTERVAL = float(env('EXPORT_IMAGE_CACHE_EVICT_INTERVAL', default='300'))
+
+# Observability: per-stage Server-Timing header and the health/metrics/ endpoint
+# (metrics are public unless METRICS_TOKEN is set, then a Bearer token is required)
+SERVER_TIMING_ENABLED = env.bool('SERVER_TIMING_ENABLED', default=True)
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
 
 # File Upload Configuration
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB